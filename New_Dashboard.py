@@ -5,14 +5,17 @@ import matplotlib.pyplot as plt
 import numpy as np
 import plotly.express as px
 import dash_bootstrap_components as dbc
-from dash import Dash, dcc, callback, Output, Input, html, dash_table, State
+from dash import Dash, dcc, callback, clientside_callback, ClientsideFunction, Output, Input, html, dash_table, State, no_update, Patch, DiskcacheManager
 import webbrowser
 from threading import Timer
+import uuid
+import time
 import datetime as dt
 from scipy import stats as scipystat
 import math
 import base64
-import io
+import os
+import diskcache
 
 # Import functions from the dashboard components module
 from dashboard_components import (
@@ -31,38 +34,58 @@ from dashboard_components import (
     get_age_dropdown_options,
     create_district_heat_map,
     create_zipcode_map,
+    split_map_geometry,
+    map_geometry_key,
     create_funnel_chart,
     single_var_freq,
     multi_var_freq,
-    slice_by_active,
     collected_freq_cols,
     notcollected_freq_cols,
-    filter_populations,
-    update_global_dataframes,
     create_likert_pie_card,
-    get_likert_pie_figure
+    get_likert_pie_figure,
+    paged_table,
+    table_page
+)
+
+from freq_cube import (
+    frequency_columns,
+    filter_populations,
+    coded_columns,
+    distinct_values,
+    service_years
 )
 
 from data_processing import (
+    build_zip_county_index,
     process_uploaded_data,
-    create_processing_summary
+    summarize_processing,
+    create_processing_summary,
+    create_stage_summary,
+    read_workbook_sheets
 )
+from ingest_stats import IngestStats, log_ingest_stats
 
-# Import dashboard_components module to set global variables
+from upload_cache import (
+    workbook_digest,
+    load_cached_frames,
+    store_cached_frames
+)
+
+# Import dashboard_components module to share the ZIP -> county lookup
 import dashboard_components
-# Import create_zipcode_map from dashboard_components (no separate import needed)
 
-# Initialize empty datasets - data will be loaded through File Uploader tab
-clients_raw = pd.DataFrame()
-hours = pd.DataFrame()
-survey_raw = pd.DataFrame()
-clients = pd.DataFrame()
-schoolclub_hours = pd.DataFrame(columns=['School', 'Hours', 'Club'])
-qtr_vol_counts = pd.DataFrame(columns=['QTR', 'Active Volunteers'])
+from geometry_cache import feature_collection, lod_for_zoom, shipped_geometry
+
+from dataset_store import (
+    register_session_dataset,
+    get_session_dataset
+)
+from figure_cache import cached_figure
+from popstats import popstat_columns, popstat_table
+from metrics import init_metrics
 
-# Initialize global variables in dashboard_components for frequency functions
-dashboard_components.hours = hours
-dashboard_components.clients = clients
+# Uploaded datasets live in the per-session dataset store (dataset_store.py);
+# every callback resolves the caller's dataset from the session id in the page
 
 # Configuration data
 bexar_zips = [78245,78254,78249,78253,78251,78228,78250,78240,78247,78207,78223,78258,78201,78227,78230,78233,78213,78221,78216,78109,78209,78244,78237,78218,78232,78260,78210,78023,78229,78217,78242,78239,78211,78238,78212,78222,78259,78261,78148,78214,78224,78015,78219,78220,78255,78248,78264,78252,78225,78204,78256,78073,78202,78112,78231,78236,78002,78226,78203,78257,78263,78208,78215,78152,78234,78205,78235,78243,78206,78262,78275,78286,78287,78054,78150,78241,78246,78265,78268,78270,78269,78278,78280,78279,78284,78283,78285,78288,78291,78289,78293,78292,78295,78294,78297,78296,78299,78298]
@@ -86,6 +109,10 @@ county_zips = {
     'Medina': medina_zips
 }
 
+# ZIP -> county lookup built once and shared with the processing and map functions
+zip_county_index = build_zip_county_index(county_zips)
+dashboard_components.zip_county_index = zip_county_index
+
 zips_for_incomes = [78002, 78003, 78004, 78006, 78008, 78009, 78011, 78012, 78013, 78015, 78016, 78023, 78026, 78027, 78039, 78050, 78052, 78055, 78056, 78057, 78059, 78062, 78063, 78064, 78065, 78066, 78069, 78070, 78073, 78074, 78101, 78108, 78109, 78112, 78113, 78114, 78121, 78123, 78124, 78130, 78132, 78133, 78140, 78143, 78147, 78148, 78150, 78152, 78154, 78155, 78160, 78161, 78163, 78201, 78202, 78203, 78204, 78205, 78207, 78208, 78209, 78210, 78211, 78212, 78213, 78214, 78215, 78216, 78217, 78218, 78219, 78220, 78221, 78222, 78223, 78224, 78225, 78226, 78227, 78228, 78229, 78230, 78231, 78232, 78233, 78234, 78235, 78236, 78237, 78238, 78239, 78240, 78242, 78243, 78244, 78245, 78247, 78248, 78249, 78250, 78251, 78252, 78253, 78254, 78255, 78256, 78257, 78258, 78259, 78260, 78261, 78263, 78264, 78266, 78606, 78623, 78638, 78648, 78655, 78666, 78670, 78850, 78861, 78883, 78884, 78885, 78886]
 
 zip_income_list = ['64082', '54500', '160147', '110955', '-', '102724', '29089', '47708', '79770', '155488', '57609', '129701', '77257', '108434', '74013', '91212', '69018', '71635', '122026', '63967', '72254', '-', '79066', '69407', '63653', '92813', '71071', '115076', '65342', '-', '90413', '117304', '87635', '54445', '90191', '84260', '126726', '95700', '82534', '84426', '126934', '80777', '49032', '-', '72961', '75395', '-', '102212', '97465', '71367', '62188', '75966', '133681', '46129', '43708', '34815', '54667', '34631', '30655', '23194', '84180', '51990', '54279', '60222', '53342', '41334', '82128', '55488', '56852', '56833', '52147', '41244', '63114', '64251', '50352', '57965', '46829', '32340', '48049', '50865', '46718', '71564', '103538', '84633', '73729', '100096', '64919', '96771', '40233', '56227', '71455', '62203', '48979', '-', '67789', '87890', '89184', '130605', '80851', '80289', '78025', '79635', '104260', '115823', '151673', '72797', '74540', '116133', '109429', '150705', '140120', '81793', '60245', '132470', '89980', '122143', '82760', '56533', '48409', '55478', '76591', '77344', '64491', '36189', '82292', '70833', '119276']
@@ -107,55 +134,14 @@ schools_with_clubs = ['Brackenridge High School','Whittier Middle School', 'Dris
                       'Churchill High School', 'Johnson High School', 'CAST Tech High School' , 'IDEA Converse', 'RISE Inspire Academy', 
                       'Nimitz Middle School', 'Thomas Jefferson High School', "Young Men's Leadership Academy", 'Southside High School']
 
-general_agg_stats = {'Galaxy ID': 'count',
-            'Age at Sign Up': ['mean', 'median', 'min', 'max'],
-            'Service Range': 'mean',
-            'Hours': ['sum', 'mean'],
-            'Follow Through': ['sum', 'mean'],
-            'Trip Eligible (Yes/No)': ['sum', 'mean'],
-            'Service Count': ['mean', 'sum'],
-            'Responses' : ['mean', 'sum'],
-            'Make It Happen Badge (Yes/No)': ['sum', 'mean'],
-            'Scholarship Badge (Yes/No)': ['sum', 'mean'],
-            'Explore Participation': ['sum', 'mean']}
-
-age_agg_stats = {'Galaxy ID': 'count',
-            'Service Range': 'mean',
-            'Hours': ['sum', 'mean'],
-            'Follow Through': ['sum', 'mean'],
-            'Trip Eligible (Yes/No)': ['sum', 'mean'],
-            'Service Count': ['mean', 'sum'],
-            'Responses' : ['mean', 'sum'],
-            'Make It Happen Badge (Yes/No)': ['sum', 'mean'],
-            'Scholarship Badge (Yes/No)': ['sum', 'mean'],
-            'Explore Participation': ['sum', 'mean']}
-
-def population_stat(df, col):
-    """Population statistics function"""
-    if df.empty or col not in df.columns:
-        return pd.DataFrame(), pd.DataFrame()
-    
-    if col != 'Age at Sign Up':
-        agg_name = df.groupby(by=col).agg(general_agg_stats)
-    else:
-        agg_name = df.groupby(by=col).agg(age_agg_stats)
-    
-    if 'Service Range' in agg_name.columns:
-        agg_name['Service Range'] = agg_name['Service Range','mean'].dt.days
-
-    agg_name.sort_values(by=('Galaxy ID', 'count'), ascending=False, inplace=True)
-    agg_name = agg_name.round(2)
-
-    flat_name = agg_name.copy()
-    flat_name.columns = ['_'.join(col).strip() for col in flat_name.columns.values]
-    flat_name.reset_index(inplace=True)
-    flat_name = flat_name.round(2)
-
-    return agg_name, flat_name
-
 # --- THEME & FONTS ---
 # Use Flatly theme and Font Awesome icons for a modern look
 
+# Background jobs (file uploads) run in separate processes and report back through a local disk cache
+job_cache_dir = os.environ.get('SOS_JOB_CACHE_DIR',
+                               os.path.join(os.path.dirname(os.path.abspath(__file__)), '.job_cache'))
+background_callback_manager = DiskcacheManager(diskcache.Cache(job_cache_dir))
+
 # Initialize the Dash app first
 app = Dash(
     __name__,
@@ -165,9 +151,13 @@ app = Dash(
         '/assets/custom_designer.css', 
         '/assets/likert_dropdown.css'
     ],
-    suppress_callback_exceptions=True
+    suppress_callback_exceptions=True,
+    background_callback_manager=background_callback_manager
 )
 
+# Per-callback latency, error and payload metrics on /metrics
+init_metrics(app)
+
 # Update the app initialization with SOS branding
 app.index_string = '''
 <!DOCTYPE html>
@@ -587,20 +577,33 @@ main_content = dbc.Col([
     dcc.Store(id="active-tab-store", data="dashboard"),
     dcc.Store(id="sidebar-collapsed", data=False),
     html.Div(id="tab-content", style={'padding': '30px 20px', 'height': '100%', 'overflowY': 'auto'}),
-    html.Div(id="data-store", style={'display': 'none'})
+    # Dataset version token ({'version': upload digest, 'uploaded_at': ...}); data callbacks refresh on it
+    dcc.Store(id="dataset-token", storage_type="session"),
+    # Map geometry is sent to the browser once per layer; map updates only carry values.
+    # Kept outside the tab layouts so switching tabs does not drop the geometry already sent.
+    dcc.Store(id='map-geometry', data={}),
+    dcc.Store(id='map-geometry-keys', data=[]),
+    dcc.Store(id='map-values'),
+    dcc.Store(id='map-view'),
+    dcc.Store(id="upload-result")
 ], width=10, id="main-content", style={'padding': '0', 'transition': 'all 0.3s ease', 'height': '100vh'})
 
-app.layout = dbc.Container([
-    dbc.Row([
-        sidebar,
-        main_content
-    ], style={'height': '100vh', 'margin': '0', 'flexWrap': 'nowrap', 'minHeight': '100vh'})
-], fluid=True, style={'padding': '0', 'maxWidth': '100vw', 'overflowX': 'hidden', 'height': '100vh', 'minHeight': '100vh'})
+def serve_layout():
+    """Build the page layout with a new session id (kept in session storage, so it survives reloads of the tab)"""
+    return dbc.Container([
+        dcc.Store(id="session-id", data=str(uuid.uuid4()), storage_type="session"),
+        dbc.Row([
+            sidebar,
+            main_content
+        ], style={'height': '100vh', 'margin': '0', 'flexWrap': 'nowrap', 'minHeight': '100vh'})
+    ], fluid=True, style={'padding': '0', 'maxWidth': '100vw', 'overflowX': 'hidden', 'height': '100vh', 'minHeight': '100vh'})
+
+app.layout = serve_layout
 
 # Define layouts
 likert_indices = [0, 18, 19]  # Indices of Likert questions to show in dropdown (match working_pie.py)
 
-def get_likert_columns():
+def get_likert_columns(survey_raw):
     if not survey_raw.empty:
         # If there are at least 20 columns, use [0, 18, 19] as in working_pie.py
         if len(survey_raw.columns) > 19:
@@ -743,7 +746,14 @@ dashboard_layout = html.Div([
                             style={'marginBottom': '20px', 'fontSize': '14px'}
                         )
                     ], className="dropdown-container"),
-                    html.Div(id='map-display-area', 
+                    html.Div([
+                        html.Div(id='map-message'),
+                        dcc.Graph(
+                            id='map-graph',
+                            style={'height': '750px', 'width': '100%', 'display': 'none'},
+                            config={'responsive': True, 'displayModeBar': True, 'modeBarButtonsToRemove': ['lasso2d', 'select2d', 'toggleSpikelines']}
+                        )
+                    ], id='map-display-area', 
                             style={'height': '600px', 'width': '100%'},
                             className="graph-container")
                 ], className="card-body")
@@ -788,8 +798,7 @@ population_stats_layout = [
                                  style={'fontWeight': '600', 'fontSize': '16px', 'color': '#2c3e50'}),
                         dcc.Dropdown(
                             id='popstat-drop',
-                            options=[{'label': col, 'value': col} for col in ['Zip Code', 'Age at Sign Up', 'Age Now',
-                                'School', 'District', 'Race/Ethnicity', 'Gender', 'Income Range (Thousands)']],
+                            options=[{'label': col, 'value': col} for col in popstat_columns],
                             value='District',
                             style={'marginBottom': '20px', 'fontSize': '14px'}
                         )
@@ -1059,7 +1068,15 @@ file_uploader_layout = html.Div([
                                 'margin': '10px'
                             },
                             multiple=False
-                        )
+                        ),
+                        html.Div([
+                            dbc.Progress(id='upload-progress', value=0, striped=True, animated=True,
+                                         className="mb-2", style={'height': '20px'}),
+                            dbc.Button([
+                                html.I(className="fas fa-times me-2"),
+                                "Cancel Upload"
+                            ], id='upload-cancel-button', color="secondary", size="sm")
+                        ], id='upload-progress-container', style={'display': 'none'}, className="mt-3")
                     ], className="upload-area text-center")
                 ], className="card-body")
             ], className='card mb-4')
@@ -1075,7 +1092,9 @@ file_uploader_layout = html.Div([
                            style={'color': 'white', 'fontWeight': '600'})
                 ], className="card-header"),
                 dbc.CardBody([
-                    html.Div(id='upload-status', className="mb-3"),
+                    html.Div(dbc.Alert("No file uploaded", color="info", className="status-indicator"),
+                             id='upload-status', className="mb-3"),
+                    html.Div(id='upload-summary', className="mb-3"),
                     html.Div([
                         html.H6("Dataset Information", 
                                className="mb-3",
@@ -1084,22 +1103,23 @@ file_uploader_layout = html.Div([
                             html.Div([
                                 html.I(className="fas fa-file me-2"),
                                 html.Span("File: ", style={'fontWeight': '600'}),
-                                html.Span(id='dataset-file-info')
+                                html.Span("No file loaded", id='dataset-file-info')
                             ], className="mb-2"),
                             html.Div([
                                 html.I(className="fas fa-users me-2"),
                                 html.Span("Total Clients: ", style={'fontWeight': '600'}),
-                                html.Span(id='dataset-client-count')
+                                html.Span("Total Clients: 0", id='dataset-client-count')
                             ], className="mb-2"),
                             html.Div([
                                 html.I(className="fas fa-clock me-2"),
                                 html.Span("Total Service Hours Records: ", style={'fontWeight': '600'}),
-                                html.Span(id='dataset-hours-count')
+                                html.Span("Total Service Hours Records: 0", id='dataset-hours-count')
                             ], className="mb-2"),
                             html.Div([
                                 html.I(className="fas fa-check-circle me-2"),
                                 html.Span("Status: ", style={'fontWeight': '600'}),
-                                html.Span(id='dataset-status', className="status-indicator")
+                                html.Span(html.Span("No file uploaded", className="status-indicator status-warning"),
+                                          id='dataset-status', className="status-indicator")
                             ])
                         ], style={'fontSize': '14px', 'color': '#2c3e50'})
                     ])
@@ -1223,84 +1243,125 @@ def switch_internal_subtab(active_subtab):
     return population_stats_layout
 
 # File upload and data processing
+# Upload progress stages: (percent complete, label)
+upload_stages = {
+    'decode': (5, "Decoding file..."),
+    'sheets': (20, "Reading sheets..."),
+    'cleaning': (45, "Cleaning client records..."),
+    'geography': (65, "Assigning counties and incomes..."),
+    'aggregates': (80, "Building aggregates..."),
+    'saving': (95, "Saving processed data...")
+}
+
+# The upload pipeline runs as a background job so large files do not block a server worker.
+# The job writes the processed frames to the upload cache and returns the cache key;
+# activate_uploaded_dataset then loads them into this process.
 @callback(
-    [Output('upload-status', 'children'),
-     Output('data-store', 'children'),
-     Output('dataset-file-info', 'children'),
-     Output('dataset-client-count', 'children'),
-     Output('dataset-hours-count', 'children'),
-     Output('dataset-status', 'children')],
-    Input('upload-data', 'contents'),
-    State('upload-data', 'filename')
+    output=[Output('upload-status', 'children'),
+            Output('upload-result', 'data'),
+            Output('dataset-file-info', 'children'),
+            Output('dataset-client-count', 'children'),
+            Output('dataset-hours-count', 'children'),
+            Output('dataset-status', 'children')],
+    inputs=Input('upload-data', 'contents'),
+    state=State('upload-data', 'filename'),
+    background=True,
+    progress=[Output('upload-progress', 'value'),
+              Output('upload-progress', 'label')],
+    running=[(Output('upload-progress-container', 'style'), {'display': 'block'}, {'display': 'none'})],
+    cancel=[Input('upload-cancel-button', 'n_clicks')],
+    prevent_initial_call=True
 )
-def handle_file_upload(contents, filename):
+def handle_file_upload(set_progress, contents, filename):
     if contents is None:
         return (
             dbc.Alert("No file uploaded", color="info", className="status-indicator"),
-            "", "No file loaded", "Total Clients: 0", "Total Service Hours Records: 0", 
+            no_update, "No file loaded", "Total Clients: 0", "Total Service Hours Records: 0", 
             html.Span("No file uploaded", className="status-indicator status-warning")
         )
     
+    def report(stage):
+        set_progress(upload_stages[stage])
+    
+    # Per-stage time, rows and memory, shown in the upload summary and logged
+    stats = IngestStats()
+    
     try:
         # Decode the uploaded file
+        report('decode')
+        stats.start('decode')
         content_type, content_string = contents.split(',')
         decoded = base64.b64decode(content_string)
         
-        # Read Excel file
-        excel_file = pd.ExcelFile(io.BytesIO(decoded))
-        print("Excel sheet names:", excel_file.sheet_names)
+        # Reuse the processed frames if this exact workbook was uploaded before
+        digest = workbook_digest(decoded)
+        stats.finish()
+        stats.start('cache lookup')
+        cached = load_cached_frames(digest)
         
-        # Only require 'Clients' and 'Service Hours' for upload
-        required_sheets = ['Clients', 'Service Hours']
-        missing_sheets = [sheet for sheet in required_sheets if sheet not in excel_file.sheet_names]
-        
-        if missing_sheets:
-            return (
-                dbc.Alert(
-                    f"Error: Missing required sheets: {', '.join(missing_sheets)}. "
-                    f"Found sheets: {', '.join(excel_file.sheet_names)}",
-                    color="danger",
-                    className="status-indicator status-error"
-                ), 
-                "", "File: No file loaded", "Total Clients: 0", "Total Service Hours Records: 0", 
-                html.Span("Upload failed", className="status-indicator status-error")
-            )
-        
-        # Read the sheets
-        clients_raw = pd.read_excel(io.BytesIO(decoded), sheet_name='Clients')
-        hours = (pd.read_excel(io.BytesIO(decoded), sheet_name='Service Hours')
-                .rename({'userId': 'Galaxy ID'}, axis=1))
-        
-        # Try to load 'Likert Scale' sheet for survey_raw
-        if 'Likert Scale' in excel_file.sheet_names:
-            survey_raw = pd.read_excel(io.BytesIO(decoded), sheet_name='Likert Scale')
-            print("Likert DataFrame shape:", survey_raw.shape)
-            print("Likert DataFrame columns:", list(survey_raw.columns))
+        if cached is not None:
+            print(f"Loaded processed upload from cache ({digest[:12]})")
+            frames = cached
+            stats.finish(rows_out=len(cached['clients']))
         else:
-            survey_raw = pd.DataFrame()  # fallback if not present
-        
-        # Process the data
-        clients, schoolclub_hours, qtr_vol_counts = process_uploaded_data(
-            clients_raw, hours, survey_raw, county_zips, zip_incomes, 
-            county_incomes, schools_with_clubs, yes_no_cols
-        )
-        
-        # Update global variables
-        globals().update({
-            'clients_raw': clients_raw,
-            'hours': hours,
-            'survey_raw': survey_raw,
-            'clients': clients,
-            'schoolclub_hours': schoolclub_hours,
-            'qtr_vol_counts': qtr_vol_counts
-        })
-        
-        # Update dashboard_components globals
-        dashboard_components.hours = hours
-        dashboard_components.clients = clients
+            stats.finish()
+            # Read Excel file - the workbook is parsed once and every sheet comes from that parse
+            report('sheets')
+            stats.start('sheets')
+            sheet_names, sheets = read_workbook_sheets(decoded, ['Clients', 'Service Hours', 'Likert Scale'])
+            stats.finish(rows_out=sum(len(sheet) for sheet in sheets.values()))
+            print("Excel sheet names:", sheet_names)
+            
+            # Only require 'Clients' and 'Service Hours' for upload
+            required_sheets = ['Clients', 'Service Hours']
+            missing_sheets = [sheet for sheet in required_sheets if sheet not in sheet_names]
+            
+            if missing_sheets:
+                return (
+                    dbc.Alert(
+                        f"Error: Missing required sheets: {', '.join(missing_sheets)}. "
+                        f"Found sheets: {', '.join(sheet_names)}",
+                        color="danger",
+                        className="status-indicator status-error"
+                    ), 
+                    no_update, "File: No file loaded", "Total Clients: 0", "Total Service Hours Records: 0", 
+                    html.Span("Upload failed", className="status-indicator status-error")
+                )
+            
+            # Read the sheets
+            clients_raw = sheets['Clients']
+            hours = sheets['Service Hours'].rename({'userId': 'Galaxy ID'}, axis=1)
+            
+            # Try to load 'Likert Scale' sheet for survey_raw
+            if 'Likert Scale' in sheets:
+                survey_raw = sheets['Likert Scale']
+                print("Likert DataFrame shape:", survey_raw.shape)
+                print("Likert DataFrame columns:", list(survey_raw.columns))
+            else:
+                survey_raw = pd.DataFrame()  # fallback if not present
+            
+            # Process the data
+            processed = process_uploaded_data(
+                clients_raw, hours, survey_raw, zip_county_index, zip_incomes, 
+                county_incomes, schools_with_clubs, yes_no_cols, progress=report, stats=stats
+            )
+            
+            # The cache is how the processed frames reach the dashboard, so a failed write fails the upload
+            report('saving')
+            stats.start('saving')
+            frames = dict(processed, clients_raw=clients_raw, survey_raw=survey_raw)
+            stored = store_cached_frames(digest, frames)
+            stats.finish()
+            if not stored:
+                raise RuntimeError("processed data could not be saved")
         
-        # Create summary
-        summary = create_processing_summary(clients_raw, hours, survey_raw, clients, schoolclub_hours, qtr_vol_counts, filename)
+        # The summary figures travel with the upload result, so showing the summary needs no frames
+        stats.start('summary', rows_in=len(frames['clients']))
+        summary = summarize_processing(frames['clients_raw'], frames['hours'], frames['survey_raw'], frames['clients'],
+                                       frames['schoolclub_hours'], frames['qtr_vol_counts'])
+        stats.finish()
+        # Logged here rather than by the summary display, which only runs while the File Uploader tab is open
+        log_ingest_stats(filename, digest, stats.stages)
         
         return (
             dbc.Alert(
@@ -1308,10 +1369,10 @@ def handle_file_upload(contents, filename):
                 color="success",
                 className="status-indicator status-success"
             ),
-            summary,
+            {'digest': digest, 'filename': filename, 'summary': summary, 'stages': stats.stages},
             f"File: {filename}",
-            f"Total Clients: {len(clients_raw)}",
-            f"Total Service Hours Records: {len(hours)}",
+            f"Total Clients: {len(frames['clients_raw'])}",
+            f"Total Service Hours Records: {len(frames['hours'])}",
             html.Span("Upload successful", className="status-indicator status-success")
         )
         
@@ -1322,31 +1383,87 @@ def handle_file_upload(contents, filename):
                 color="danger",
                 className="status-indicator status-error"
             ),
-            "", "File: Error processing", "Total Clients: 0", "Total Service Hours Records: 0",
+            no_update, "File: Error processing", "Total Clients: 0", "Total Service Hours Records: 0",
             html.Span("Upload failed", className="status-indicator status-error")
         )
 
+# Load a finished upload into the caller's session
+@callback(
+    [Output('dataset-token', 'data'),
+     Output('upload-status', 'children', allow_duplicate=True)],
+    Input('upload-result', 'data'),
+    State('session-id', 'data'),
+    prevent_initial_call=True
+)
+def activate_uploaded_dataset(upload_result, session_id):
+    if not upload_result:
+        return no_update, no_update
+    
+    if register_session_dataset(session_id, upload_result['digest'], upload_result['filename']) is None:
+        return no_update, dbc.Alert([
+            html.I(className="fas fa-exclamation-triangle me-2"),
+            html.Strong("Could not load the processed upload. "),
+            "Please upload the file again."
+        ], color="danger", className="status-indicator status-error")
+    return {'version': upload_result['digest'], 'uploaded_at': time.time()}, no_update
+
+# Processing summary of the last upload, with the time, rows and memory of each ingest stage.
+# Also runs when the File Upload tab is reopened; it is rebuilt from the upload result alone.
+@callback(
+    Output('upload-summary', 'children'),
+    Input('upload-result', 'data')
+)
+def show_upload_summary(upload_result):
+    if not upload_result:
+        return None
+    
+    return html.Div([create_processing_summary(upload_result['summary'], upload_result['filename']),
+                     create_stage_summary(upload_result.get('stages', []))])
+
+def dataset_version(dataset):
+    """
+    Cache key of a dataset: the digest of the upload it was loaded from, or None for the empty dataset
+    (which is never cached). Taken from the dataset itself rather than the browser's dataset-token, which
+    can name an upload this session no longer resolves to.
+    """
+    return dataset['digest']
+
 # Update all dashboard components when data changes
 @callback(
     [Output('club-comparison-chart', 'figure'),
      Output('club-confidence-intervals', 'children'),
      Output('total-value-display', 'children')],
-    [Input('data-store', 'children')]
+    [Input('dataset-token', 'data')],
+    State('session-id', 'data')
 )
-def update_dashboard_components(data_store):
-    # Create all dashboard components using our modular functions
-    club_fig, club_intervals = create_club_comparison_chart(schoolclub_hours)
-    total_value = f"${calculate_hours_value(clients)}"
+def update_dashboard_components(dataset_token, session_id):
+    dataset = get_session_dataset(session_id)
+    clients, schoolclub_hours = dataset['clients'], dataset['schoolclub_hours']
     
-    return club_fig, club_intervals, total_value
+    def build():
+        # Create all dashboard components using our modular functions
+        club_fig, club_intervals = create_club_comparison_chart(schoolclub_hours)
+        total_value = f"${calculate_hours_value(clients)}"
+        return club_fig, club_intervals, total_value
+    
+    return cached_figure(dataset_version(dataset), 'dashboard_components', (), build)
+
+def dataset_popstat_table(dataset, popstat):
+    """Population statistics table precomputed for the dataset, or computed now for other columns"""
+    table = dataset['popstats'].get(popstat)
+    return table if table is not None else popstat_table(dataset['clients'], popstat)
 
 # Population statistics
 @callback(
     Output('popstat-table-container', 'children'),
     [Input('popstat-drop', 'value'),
-     Input('data-store', 'children')]
+     Input('dataset-token', 'data')],
+    State('session-id', 'data')
 )
-def popstat_dashtable(popstat, data_store):
+def popstat_dashtable(popstat, dataset_token, session_id):
+    dataset = get_session_dataset(session_id)
+    clients = dataset['clients']
+    
     if clients.empty or popstat not in clients.columns:
         return html.Div([
             html.P("No data available. Please upload a dataset first.", 
@@ -1355,8 +1472,7 @@ def popstat_dashtable(popstat, data_store):
         ])
     
     try:
-        agg_stat, flat_stat = population_stat(clients, popstat)
-        return dbc.Table.from_dataframe(agg_stat.reset_index().sort_values(by=popstat))
+        return paged_table('popstat-table', dataset_popstat_table(dataset, popstat))
     except Exception as e:
         return html.Div([
             html.P(f"Error generating statistics: {str(e)}", 
@@ -1364,74 +1480,167 @@ def popstat_dashtable(popstat, data_store):
                    style={'padding': '20px'})
         ])
 
+@callback(
+    [Output('popstat-table', 'data'),
+     Output('popstat-table', 'page_count'),
+     Output('popstat-table', 'page_current')],
+    [Input('popstat-table', 'page_current'),
+     Input('popstat-table', 'page_size'),
+     Input('popstat-table', 'sort_by'),
+     Input('popstat-table', 'filter_query')],
+    [State('popstat-drop', 'value'),
+     State('dataset-token', 'data'),
+     State('session-id', 'data')],
+    prevent_initial_call=True
+)
+def page_popstat_table(page_current, page_size, sort_by, filter_query, popstat, dataset_token, session_id):
+    """Serve the requested page of the population statistics table"""
+    dataset = get_session_dataset(session_id)
+    if dataset['clients'].empty or popstat not in dataset['clients'].columns:
+        return [], 1, 0
+    return table_page(dataset_popstat_table(dataset, popstat), page_current, page_size, sort_by, filter_query)
+
 # Map display
+map_graph_style = {'height': '750px', 'width': '100%'}
+
+def map_message(text):
+    """Map outputs showing a message in place of the map"""
+    return (html.P(text, className="text-muted text-center", style={'padding': '50px'}),
+            dict(map_graph_style, display='none'), no_update, no_update, no_update, None)
+
+def ship_map_geometry(geometry_key, geojson, geometry_keys):
+    """Geometry store outputs: the layer as a Patch if the browser does not have it yet, else no_update"""
+    if geometry_key is None or geometry_key in (geometry_keys or []):
+        return no_update, no_update
+    # Patch adds the layer to the browser's geometry store without resending the others
+    geometry = Patch()
+    geometry[geometry_key] = shipped_geometry(geojson)
+    return geometry, (geometry_keys or []) + [geometry_key]
+
+def map_figure(version, map_type, build, geometry_keys):
+    """Map outputs for a figure, shipping its geometry only if the browser does not have it yet"""
+    geometry_key, geojson, figure = cached_figure(version, 'map_display', (map_type,),
+                                                  lambda: split_map_geometry(build()))
+    geometry, geometry_keys = ship_map_geometry(geometry_key, geojson, geometry_keys)
+    
+    # What refine_map_geometry needs to rebuild the same shapes at another level of detail
+    view = None
+    if geojson is not None:
+        view = {'source': geojson['source'], 'lod': geojson['lod'],
+                'ids': [feature['id'] for feature in geojson['features']]}
+    return None, map_graph_style, {'layer': geometry_key, 'figure': figure}, geometry, geometry_keys, view
+
 @callback(
-    Output('map-display-area', 'children'),
+    [Output('map-message', 'children'),
+     Output('map-graph', 'style'),
+     Output('map-values', 'data'),
+     Output('map-geometry', 'data'),
+     Output('map-geometry-keys', 'data'),
+     Output('map-view', 'data')],
     [Input('map-type-dropdown', 'value'),
-     Input('data-store', 'children')]
+     Input('dataset-token', 'data')],
+    [State('map-geometry-keys', 'data'),
+     State('session-id', 'data')]
 )
-def update_map_display(map_type, data_store):
+def update_map_display(map_type, dataset_token, geometry_keys, session_id):
+    dataset = get_session_dataset(session_id)
+    clients, hours = dataset['clients'], dataset['hours']
+    version = dataset_version(dataset)
+    
     try:
         if map_type == 'clients':
             if clients.empty:
-                return html.P("Upload data to view client distribution map", 
-                             className="text-muted text-center",
-                             style={'padding': '50px'})
-            fig = create_heatmap_from_dataframe(clients, height=750)
-            return dcc.Graph(
-                figure=fig, 
-                style={'height': '750px', 'width': '100%'},
-                config={'responsive': True, 'displayModeBar': True, 'modeBarButtonsToRemove': ['lasso2d', 'select2d', 'toggleSpikelines']}
-            )
+                return map_message("Upload data to view client distribution map")
+            return map_figure(version, map_type, lambda: create_heatmap_from_dataframe(clients, height=750), geometry_keys)
         
         elif map_type == 'events':
             if hours.empty:
-                return html.P("Upload data to view service events map", 
-                             className="text-muted text-center",
-                             style={'padding': '50px'})
-            fig = create_service_events_heatmap(hours, height=750)
-            return dcc.Graph(
-                figure=fig, 
-                style={'height': '750px', 'width': '100%'},
-                config={'responsive': True, 'displayModeBar': True, 'modeBarButtonsToRemove': ['lasso2d', 'select2d', 'toggleSpikelines']}
-            )
+                return map_message("Upload data to view service events map")
+            return map_figure(version, map_type, lambda: create_service_events_heatmap(hours, height=750), geometry_keys)
         
         elif map_type == 'district_heat':
             if clients.empty:
-                return html.P("Upload data to view district heat map", 
-                             className="text-muted text-center",
-                             style={'padding': '50px'})
-            fig = create_district_heat_map(clients)
-            return dcc.Graph(
-                figure=fig, 
-                style={'height': '750px', 'width': '100%'},
-                config={'responsive': True, 'displayModeBar': True, 'modeBarButtonsToRemove': ['lasso2d', 'select2d', 'toggleSpikelines']}
-            )
+                return map_message("Upload data to view district heat map")
+            return map_figure(version, map_type, lambda: create_district_heat_map(clients), geometry_keys)
         
         elif map_type == 'zipcode_hours':
-            fig = create_zipcode_map()
-            return dcc.Graph(
-                figure=fig,
-                style={'height': '750px', 'width': '100%'},
-                config={'responsive': True, 'displayModeBar': True, 'modeBarButtonsToRemove': ['lasso2d', 'select2d', 'toggleSpikelines']}
-            )
+            return map_figure(version, map_type, lambda: create_zipcode_map(clients, hours, dataset['volunteer_service']), geometry_keys)
         
         else:
-            return html.P("Select a map type to view visualization", 
-                         className="text-muted text-center",
-                         style={'padding': '50px'})
+            return map_message("Select a map type to view visualization")
     
     except Exception as e:
-        return html.Div([
+        return (html.Div([
             html.P(f"Error loading map: {str(e)}", 
                    className="text-danger text-center",
                    style={'padding': '20px'}),
             html.P("Please check data availability and try again", 
                    className="text-muted text-center")
-        ])
+        ]), dict(map_graph_style, display='none'), no_update, no_update, no_update, None)
+
+# Swap in finer (or coarser) shapes when the user zooms the map
+@callback(
+    [Output('map-values', 'data', allow_duplicate=True),
+     Output('map-geometry', 'data', allow_duplicate=True),
+     Output('map-geometry-keys', 'data', allow_duplicate=True),
+     Output('map-view', 'data', allow_duplicate=True)],
+    Input('map-graph', 'relayoutData'),
+    [State('map-view', 'data'),
+     State('map-geometry-keys', 'data')],
+    prevent_initial_call=True
+)
+def refine_map_geometry(relayout_data, view, geometry_keys):
+    zoom = (relayout_data or {}).get('mapbox.zoom')
+    if zoom is None or not view:
+        return no_update, no_update, no_update, no_update
+    
+    lod = lod_for_zoom(zoom)
+    if lod == view['lod']:
+        return no_update, no_update, no_update, no_update
+    
+    geojson = feature_collection(view['source'], view['ids'], lod)
+    geometry_key = map_geometry_key(geojson)
+    geometry, geometry_keys = ship_map_geometry(geometry_key, geojson, geometry_keys)
+    
+    # Point the values at the new shapes and keep the user's view when the figure is redrawn
+    values = Patch()
+    values['layer'] = geometry_key
+    values['figure']['layout']['mapbox']['zoom'] = zoom
+    if 'mapbox.center' in relayout_data:
+        values['figure']['layout']['mapbox']['center'] = relayout_data['mapbox.center']
+    return values, geometry, geometry_keys, dict(view, lod=lod)
+
+# Combine the cached geometry with the latest map values in the browser (assets/map_geometry.js)
+clientside_callback(
+    ClientsideFunction(namespace='maps', function_name='attachGeometry'),
+    Output('map-graph', 'figure'),
+    [Input('map-values', 'data'),
+     Input('map-geometry', 'data')]
+)
 
 # Frequency Tables Callbacks
 
+def frequency_params(filter_pop, filter_value, year_slice):
+    """Population, population value and year slice arguments for single_var_freq/multi_var_freq"""
+    pop = filter_pop if filter_pop and filter_pop != 'all' else 'all'
+    pop_value = filter_value if filter_value is not None else None
+    slice_param = year_slice if year_slice and year_slice != 'all' else 'all'
+    return pop, pop_value, slice_param
+
+def single_frequency_table(dataset, variable, filter_pop, filter_value, year_slice):
+    """Single variable frequency table, formatted for display"""
+    pop, pop_value, slice_param = frequency_params(filter_pop, filter_value, year_slice)
+    freq_table = single_var_freq(dataset['freq_cube'], variable, pop=pop, pop_value=pop_value, slice=slice_param)
+    if not freq_table.empty:
+        freq_table.columns = [variable, 'Count']
+    return freq_table
+
+def multi_frequency_table(dataset, var1, var2, filter_pop, filter_value, year_slice):
+    """Cross-tabulation of two variables, with var1's values as the first column"""
+    pop, pop_value, slice_param = frequency_params(filter_pop, filter_value, year_slice)
+    crosstab = multi_var_freq(dataset['freq_cube'], var1, var2, pop=pop, pop_value=pop_value, slice=slice_param)
+    return crosstab.reset_index() if not crosstab.empty else crosstab
+
 # Single Variable Frequency Table Callback
 @callback(
     Output('single-freq-results', 'children'),
@@ -1439,17 +1648,13 @@ def update_map_display(map_type, data_store):
      Input('freq-single-var2', 'value'),
      Input('freq-single-var3', 'value'),
      Input('freq-single-var4', 'value'),
-     Input('data-store', 'children')]
+     Input('dataset-token', 'data')],
+    State('session-id', 'data')
 )
-def update_single_frequency_table(variable, filter_pop, filter_value, year_slice, data_store):
+def update_single_frequency_table(variable, filter_pop, filter_value, year_slice, dataset_token, session_id):
     """Generate single variable frequency table"""
-    # Use global clients DataFrame from New_Dashboard.py
-    global clients
-    from dashboard_components import single_var_freq
-    
-    # Update dashboard_components globals to ensure they have the latest data
-    import dashboard_components
-    dashboard_components.clients = clients
+    dataset = get_session_dataset(session_id)
+    clients = dataset['clients']
     
     if clients.empty:
         return html.Div([
@@ -1466,13 +1671,10 @@ def update_single_frequency_table(variable, filter_pop, filter_value, year_slice
         ])
     
     try:
-        # Set up parameters for single_var_freq function
-        pop = filter_pop if filter_pop and filter_pop != 'all' else 'all'
-        pop_value = filter_value if filter_value is not None else None
-        slice_param = year_slice if year_slice and year_slice != 'all' else 'all'
+        pop, pop_value, slice_param = frequency_params(filter_pop, filter_value, year_slice)
         
         # Generate frequency table
-        freq_table = single_var_freq(variable, pop=pop, pop_value=pop_value, slice=slice_param)
+        freq_table = single_frequency_table(dataset, variable, filter_pop, filter_value, year_slice)
         
         if freq_table.empty:
             return html.Div([
@@ -1493,9 +1695,6 @@ def update_single_frequency_table(variable, filter_pop, filter_value, year_slice
         
         title = " | ".join(title_parts)
         
-        # Format the frequency table for display
-        freq_table.columns = [variable, 'Count']
-        
         # Add summary statistics
         total_count = freq_table['Count'].sum()
         unique_values = len(freq_table)
@@ -1504,15 +1703,7 @@ def update_single_frequency_table(variable, filter_pop, filter_value, year_slice
             html.H6(title, style={'fontSize': '14px', 'fontWeight': 'bold', 'marginBottom': '10px'}),
             html.P(f"Total records: {total_count:,} | Unique values: {unique_values}", 
                    style={'fontSize': '12px', 'color': '#666', 'marginBottom': '10px'}),
-            dbc.Table.from_dataframe(
-                freq_table, 
-                striped=True, 
-                bordered=True, 
-                hover=True,
-                size='sm',
-                style={'fontSize': '12px', 'width': '100%'},
-                responsive=True
-            )
+            paged_table('single-freq-table', freq_table)
         ], style={'padding': '10px'})
         
     except Exception as e:
@@ -1530,17 +1721,13 @@ def update_single_frequency_table(variable, filter_pop, filter_value, year_slice
      Input('freq-multi-var3', 'value'),
      Input('freq-multi-var4', 'value'),
      Input('freq-multi-var5', 'value'),
-     Input('data-store', 'children')]
+     Input('dataset-token', 'data')],
+    State('session-id', 'data')
 )
-def update_multi_frequency_table(var1, var2, filter_pop, filter_value, year_slice, data_store):
+def update_multi_frequency_table(var1, var2, filter_pop, filter_value, year_slice, dataset_token, session_id):
     """Generate multivariable frequency tables (cross-tabulations)"""
-    # Use global clients DataFrame from New_Dashboard.py
-    global clients
-    from dashboard_components import multi_var_freq
-    
-    # Update dashboard_components globals to ensure they have the latest data
-    import dashboard_components
-    dashboard_components.clients = clients
+    dataset = get_session_dataset(session_id)
+    clients = dataset['clients']
     
     if clients.empty:
         return html.Div([
@@ -1557,15 +1744,12 @@ def update_multi_frequency_table(var1, var2, filter_pop, filter_value, year_slic
         ])
     
     try:
-        # Set up parameters for multi_var_freq function
-        pop = filter_pop if filter_pop and filter_pop != 'all' else 'all'
-        pop_value = filter_value if filter_value is not None else None
-        slice_param = year_slice if year_slice and year_slice != 'all' else 'all'
+        pop, pop_value, slice_param = frequency_params(filter_pop, filter_value, year_slice)
         
         # Generate cross-tabulation
-        crosstab = multi_var_freq(var1, var2, pop=pop, pop_value=pop_value, slice=slice_param)
+        crosstab_df = multi_frequency_table(dataset, var1, var2, filter_pop, filter_value, year_slice)
         
-        if crosstab.empty:
+        if crosstab_df.empty:
             return html.Div([
                 html.P("No data available for the selected parameters", 
                        className="text-muted text-center",
@@ -1584,9 +1768,6 @@ def update_multi_frequency_table(var1, var2, filter_pop, filter_value, year_slic
         
         title = " | ".join(title_parts)
         
-        # Convert crosstab to dataframe for display
-        crosstab_df = crosstab.reset_index()
-        
         # Add summary statistics
         total_count = crosstab_df.iloc[:, 1:].sum().sum()
         rows = len(crosstab_df)
@@ -1596,15 +1777,7 @@ def update_multi_frequency_table(var1, var2, filter_pop, filter_value, year_slic
             html.H6(title, style={'fontSize': '14px', 'fontWeight': 'bold', 'marginBottom': '10px'}),
             html.P(f"Total records: {total_count:,} | Rows: {rows} | Columns: {cols}", 
                    style={'fontSize': '12px', 'color': '#666', 'marginBottom': '10px'}),
-            dbc.Table.from_dataframe(
-                crosstab_df,
-                striped=True,
-                bordered=True,
-                hover=True,
-                size='sm',
-                style={'fontSize': '12px', 'width': '100%'},
-                responsive=True
-            )
+            paged_table('multi-freq-table', crosstab_df)
         ], style={'padding': '10px'})
         
     except Exception as e:
@@ -1614,6 +1787,50 @@ def update_multi_frequency_table(var1, var2, filter_pop, filter_value, year_slic
                    style={'padding': '20px', 'fontSize': '14px'})
         ])
 
+# Frequency table pages
+@callback(
+    [Output('single-freq-table', 'data'),
+     Output('single-freq-table', 'page_count'),
+     Output('single-freq-table', 'page_current')],
+    [Input('single-freq-table', 'page_current'),
+     Input('single-freq-table', 'page_size'),
+     Input('single-freq-table', 'sort_by'),
+     Input('single-freq-table', 'filter_query')],
+    [State('freq-single-var1', 'value'),
+     State('freq-single-var2', 'value'),
+     State('freq-single-var3', 'value'),
+     State('freq-single-var4', 'value'),
+     State('session-id', 'data')],
+    prevent_initial_call=True
+)
+def page_single_frequency_table(page_current, page_size, sort_by, filter_query,
+                                variable, filter_pop, filter_value, year_slice, session_id):
+    """Serve the requested page of the single variable frequency table"""
+    freq_table = single_frequency_table(get_session_dataset(session_id), variable, filter_pop, filter_value, year_slice)
+    return table_page(freq_table, page_current, page_size, sort_by, filter_query)
+
+@callback(
+    [Output('multi-freq-table', 'data'),
+     Output('multi-freq-table', 'page_count'),
+     Output('multi-freq-table', 'page_current')],
+    [Input('multi-freq-table', 'page_current'),
+     Input('multi-freq-table', 'page_size'),
+     Input('multi-freq-table', 'sort_by'),
+     Input('multi-freq-table', 'filter_query')],
+    [State('freq-multi-var1', 'value'),
+     State('freq-multi-var2', 'value'),
+     State('freq-multi-var3', 'value'),
+     State('freq-multi-var4', 'value'),
+     State('freq-multi-var5', 'value'),
+     State('session-id', 'data')],
+    prevent_initial_call=True
+)
+def page_multi_frequency_table(page_current, page_size, sort_by, filter_query,
+                               var1, var2, filter_pop, filter_value, year_slice, session_id):
+    """Serve the requested page of the cross-tabulation"""
+    crosstab_df = multi_frequency_table(get_session_dataset(session_id), var1, var2, filter_pop, filter_value, year_slice)
+    return table_page(crosstab_df, page_current, page_size, sort_by, filter_query)
+
 # Update dropdown options when data changes
 @callback(
     [Output('freq-single-var1', 'options'),
@@ -1623,38 +1840,35 @@ def update_multi_frequency_table(var1, var2, filter_pop, filter_value, year_slic
      Output('freq-multi-var2', 'options'),
      Output('freq-multi-var3', 'options'),
      Output('freq-multi-var5', 'options')],
-    Input('data-store', 'children')
+    Input('dataset-token', 'data'),
+    State('session-id', 'data')
 )
-def update_frequency_dropdown_options(data_store):
+def update_frequency_dropdown_options(dataset_token, session_id):
     """Update dropdown options based on available data columns"""
+    dataset = get_session_dataset(session_id)
+    clients = dataset['clients']
+    
     if clients.empty:
         empty_options = [{'label': 'Upload data first', 'value': None}]
         return [empty_options] * 7
     
-    # Get categorical columns suitable for frequency analysis
-    categorical_columns = ['District', 'School', 'Race/Ethnicity', 'Gender', 'County', 
-                          'Income Range (Thousands)', 'Age at Sign Up', 'Age Now',
-                          'Follow Through', 'Club', 'Learn Participation 2022', 
-                          'Explore Participation', 'Make It Happen Badge (Yes/No)',
-                          'Trip Eligible (Yes/No)', 'Scholarship Badge (Yes/No)',
-                          'Zip Code']
-    
-    # Filter to only include columns that exist in the data
-    available_columns = [col for col in categorical_columns if col in clients.columns]
+    # Only offer frequency table columns the dataset's frequency cube could code
+    # (columns missing from the data, or whose mixed-type values cannot be sorted, are left out)
+    cube = dataset['freq_cube']
+    available_columns = coded_columns(cube, frequency_columns)
     
     # Variable options (for dropdowns 1)
     var_options = [{'label': col, 'value': col} for col in available_columns]
     var_options.insert(0, {'label': 'Select variable...', 'value': None})
     
     # Filter population options (from filter_populations)
-    filter_pop_options = [{'label': pop, 'value': pop} for pop in filter_populations if pop in clients.columns]
+    filter_pop_options = [{'label': pop, 'value': pop} for pop in coded_columns(cube, filter_populations)]
     filter_pop_options.insert(0, {'label': 'All (no filter)', 'value': 'all'})
     
-    # Year options (from hours data if available)
+    # Year options (service years indexed at upload, with active client counts)
     year_options = [{'label': 'All years', 'value': 'all'}]
-    if not hours.empty and 'Event Date' in hours.columns:
-        years = sorted(hours['Event Date'].dt.year.unique())
-        year_options.extend([{'label': str(year), 'value': year} for year in years])
+    year_options.extend([{'label': f"{year} ({count:,})", 'value': year}
+                         for year, count in service_years(cube)])
     
     return (
         var_options,  # freq-single-var1 (variable)
@@ -1666,94 +1880,79 @@ def update_frequency_dropdown_options(data_store):
                  year_options   # freq-multi-var5 (year slice)
      )
 
-# Update filter value options based on selected filter population
-@callback(
-    Output('freq-single-var3', 'options'),
-    [Input('freq-single-var2', 'value'),
-     Input('data-store', 'children')]
-)
-def update_single_filter_values(filter_pop, data_store):
-    """Update filter value options based on selected filter population"""
-    # Import here to ensure we're using the latest global dataframes
-    from dashboard_components import clients
-    
-    if clients.empty or not filter_pop or filter_pop == 'all':
+def filter_value_options(dataset, filter_pop):
+    """Filter value dropdown options from the distinct values indexed at upload, labelled with client counts"""
+    if dataset['clients'].empty or not filter_pop or filter_pop == 'all':
         return [{'label': 'No filter selected', 'value': None}]
     
-    if filter_pop in clients.columns:
-        unique_values = sorted(clients[filter_pop].dropna().unique())
-        # Convert to regular Python int for binary columns (Follow Through, Club) 
-        # to ensure proper type matching
-        if filter_pop in ['Follow Through', 'Club']:
-            try:
-                options = [{'label': str(val), 'value': int(val)} for val in unique_values]
-            except (ValueError, TypeError):
-                options = [{'label': str(val), 'value': val} for val in unique_values]
-        else:
-            options = [{'label': str(val), 'value': val} for val in unique_values]
+    if coded_columns(dataset['freq_cube'], [filter_pop]):
+        options = [{'label': f"{val} ({count:,})", 'value': val}
+                   for val, count in distinct_values(dataset['freq_cube'], filter_pop)]
         options.insert(0, {'label': 'Select value...', 'value': None})
         return options
     
     return [{'label': 'Invalid filter population', 'value': None}]
 
+# Update filter value options based on selected filter population
+@callback(
+    Output('freq-single-var3', 'options'),
+    [Input('freq-single-var2', 'value'),
+     Input('dataset-token', 'data')],
+    State('session-id', 'data')
+)
+def update_single_filter_values(filter_pop, dataset_token, session_id):
+    """Update filter value options based on selected filter population"""
+    return filter_value_options(get_session_dataset(session_id), filter_pop)
+
 @callback(
     Output('freq-multi-var4', 'options'),
     [Input('freq-multi-var3', 'value'),
-     Input('data-store', 'children')]
+     Input('dataset-token', 'data')],
+    State('session-id', 'data')
 )
-def update_multi_filter_values(filter_pop, data_store):
+def update_multi_filter_values(filter_pop, dataset_token, session_id):
     """Update filter value options based on selected filter population"""
-    # Import here to ensure we're using the latest global dataframes
-    from dashboard_components import clients
-    
-    if clients.empty or not filter_pop or filter_pop == 'all':
-        return [{'label': 'No filter selected', 'value': None}]
-    
-    if filter_pop in clients.columns:
-        unique_values = sorted(clients[filter_pop].dropna().unique())
-        # Convert to regular Python int for binary columns (Follow Through, Club) 
-        # to ensure proper type matching
-        if filter_pop in ['Follow Through', 'Club']:
-            try:
-                options = [{'label': str(val), 'value': int(val)} for val in unique_values]
-            except (ValueError, TypeError):
-                options = [{'label': str(val), 'value': val} for val in unique_values]
-        else:
-            options = [{'label': str(val), 'value': val} for val in unique_values]
-        options.insert(0, {'label': 'Select value...', 'value': None})
-        return options
-    
-    return [{'label': 'Invalid filter population', 'value': None}]
+    return filter_value_options(get_session_dataset(session_id), filter_pop)
 
 # Combined volunteers time chart callback
 @callback(
     Output('volunteers-time-chart', 'figure'),
     [Input('time-period-dropdown', 'value'),
-     Input('data-store', 'children')]
+     Input('dataset-token', 'data')],
+    State('session-id', 'data')
 )
-def update_volunteers_time_chart(time_period, data_store):
+def update_volunteers_time_chart(time_period, dataset_token, session_id):
     """Update the volunteers chart based on selected time period (quarter or month)"""
-    if time_period == 'quarter':
-        if qtr_vol_counts.empty:
-            return create_quarter_volunteers_chart(pd.DataFrame())
-        return create_quarter_volunteers_chart(qtr_vol_counts)
+    dataset = get_session_dataset(session_id)
+    qtr_vol_counts, hours = dataset['qtr_vol_counts'], dataset['hours']
     
-    elif time_period == 'month':
-        if hours.empty:
-            return create_monthly_volunteers_chart(pd.DataFrame())
-        return create_monthly_volunteers_chart(hours)
+    def build():
+        if time_period == 'quarter':
+            if qtr_vol_counts.empty:
+                return create_quarter_volunteers_chart(pd.DataFrame())
+            return create_quarter_volunteers_chart(qtr_vol_counts)
+        
+        elif time_period == 'month':
+            if hours.empty:
+                return create_monthly_volunteers_chart(pd.DataFrame())
+            return create_monthly_volunteers_chart(hours)
+        
+        # Default to quarter view
+        return create_quarter_volunteers_chart(qtr_vol_counts)
     
-    # Default to quarter view
-    return create_quarter_volunteers_chart(qtr_vol_counts)
+    return cached_figure(dataset_version(dataset), 'volunteers_time_chart', (time_period,), build)
 
 # Funnel chart callback
 @callback(
     Output('funnel-chart', 'figure'),
-    Input('data-store', 'children')
+    Input('dataset-token', 'data'),
+    State('session-id', 'data')
 )
-def update_funnel_chart(data_store):
+def update_funnel_chart(dataset_token, session_id):
     """Update the funnel chart when data changes"""
-    return create_funnel_chart()
+    dataset = get_session_dataset(session_id)
+    return cached_figure(dataset_version(dataset), 'funnel_chart', (),
+                         lambda: create_funnel_chart(dataset['clients'], dataset['hours']))
 
 
 
@@ -1763,12 +1962,14 @@ def update_funnel_chart(data_store):
     Input('analytics-population-drop', 'value'),
     Input('analytics-feature-drop', 'value'),
     Input('pie-min-portion-drop', 'value'),
-    Input('data-store', 'children')
+    Input('dataset-token', 'data'),
+    State('session-id', 'data')
 )
-def update_custom_pie(population, feature, min_portion, data_store):
+def update_custom_pie(population, feature, min_portion, dataset_token, session_id):
+    clients = get_session_dataset(session_id)['clients']
     if clients.empty or not population or not feature:
         return px.pie(title="No data")
-    df = clients.copy()
+    df = clients
 
     # Map dropdown values to actual DataFrame columns
     feature_map = {
@@ -1795,12 +1996,12 @@ def update_custom_pie(population, feature, min_portion, data_store):
         filtered = df[df[col] == 1]
         if filtered.empty:
             return px.pie(title=f"No students marked 'Yes' for {feature}")
-        values = filtered.groupby(population).size()
+        values = filtered.groupby(population, observed=True).size()
         name = "Count"
     else:
         if col not in df.columns:
             return px.pie(title=f"Feature '{col}' not found in data")
-        values = df.groupby(population)[col].sum()
+        values = df.groupby(population, observed=True)[col].sum()
         name = col
     if values.sum() == 0:
         return px.pie(title="No data to display")
@@ -1818,17 +2019,19 @@ def update_custom_pie(population, feature, min_portion, data_store):
 
 @callback(
     Output('senior-survey-likert-pie', 'figure'),
-    Input('senior-survey-likert-question-drop', 'value')
+    Input('senior-survey-likert-question-drop', 'value'),
+    State('session-id', 'data')
 )
-def update_senior_survey_likert_pie(selected_question):
-    return get_likert_pie_figure(survey_raw, selected_question)
+def update_senior_survey_likert_pie(selected_question, session_id):
+    return get_likert_pie_figure(get_session_dataset(session_id)['survey_raw'], selected_question)
 
 @callback(
     Output("senior-survey-card-container", "children"),
-    Input("data-store", "children")
+    Input("dataset-token", "data"),
+    State("session-id", "data")
 )
-def update_senior_survey_card(_):
-    return create_likert_pie_card(survey_raw, card_id_prefix="senior-survey")
+def update_senior_survey_card(dataset_token, session_id):
+    return create_likert_pie_card(get_session_dataset(session_id)['survey_raw'], card_id_prefix="senior-survey")
 
 if __name__ == '__main__':
     import os
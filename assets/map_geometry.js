@@ -0,0 +1,77 @@
+// Map geometry is sent once per layer into the map-geometry store; each map update only sends
+// the values figure (map-values). This joins the two into the figure shown by map-graph.
+// Layers arrive as compact TopoJSON (see topology.py) or plain GeoJSON.
+
+// Decoded TopoJSON layers, by geometry key
+var decodedMapLayers = {};
+
+function decodeTopology(topology) {
+    var scale = topology.transform.scale;
+    var translate = topology.transform.translate;
+
+    // Undo the delta encoding and quantization of every arc once
+    var arcs = topology.arcs.map(function(arc) {
+        var x = 0, y = 0;
+        return arc.map(function(point) {
+            x += point[0];
+            y += point[1];
+            return [x * scale[0] + translate[0], y * scale[1] + translate[1]];
+        });
+    });
+
+    function ring(arcIds) {
+        var points = [];
+        arcIds.forEach(function(i, k) {
+            // Negative ids (~i) walk a shared arc backwards
+            var arc = i >= 0 ? arcs[i] : arcs[~i].slice().reverse();
+            // Consecutive arcs share their end point
+            (k ? arc.slice(1) : arc).forEach(function(point) { points.push(point); });
+        });
+        return points;
+    }
+
+    var features = topology.objects.features.geometries.map(function(geometry) {
+        var coordinates = geometry.type === 'Polygon'
+            ? geometry.arcs.map(ring)
+            : geometry.arcs.map(function(polygon) { return polygon.map(ring); });
+        return {
+            type: 'Feature',
+            id: geometry.id,
+            properties: {},
+            geometry: {type: geometry.type, coordinates: coordinates}
+        };
+    });
+    return {type: 'FeatureCollection', features: features};
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    maps: {
+        attachGeometry: function(values, geometry) {
+            if (!values || !values.figure) {
+                return window.dash_clientside.no_update;
+            }
+            // Figures without geometry (e.g. fallback bar charts) are shown as they are
+            if (!values.layer) {
+                return values.figure;
+            }
+            var geojson = (geometry || {})[values.layer];
+            if (!geojson) {
+                return window.dash_clientside.no_update;
+            }
+            if (geojson.type === 'Topology') {
+                if (!decodedMapLayers[values.layer]) {
+                    decodedMapLayers[values.layer] = decodeTopology(geojson);
+                }
+                geojson = decodedMapLayers[values.layer];
+            }
+            var figure = Object.assign({}, values.figure);
+            figure.data = (figure.data || []).map(function(trace) {
+                if (String(trace.type).indexOf('choropleth') !== 0) {
+                    return trace;
+                }
+                return Object.assign({}, trace, {geojson: geojson});
+            });
+            return figure;
+        }
+    }
+});
@@ -0,0 +1,36 @@
+"""
+Build the compact TopoJSON map layers shipped to the browser.
+
+    python build_map_layers.py
+
+Reads the ZCTA and school district GeoJSON files, encodes every level of detail and writes
+map_layers/<layer>_<lod>.topo.json (or SOS_MAP_LAYERS_DIR). The dashboard uses these files when
+they are newer than the GeoJSON sources and encodes layers on first use otherwise.
+"""
+import json
+import os
+from geometry_cache import LOD_TOLERANCES, MAP_LAYERS_DIR, layer_features, layer_topology_path
+from topology import encode_topology
+
+def build_map_layers():
+    os.makedirs(MAP_LAYERS_DIR, exist_ok=True)
+    for source in ('zcta', 'district'):
+        for lod in LOD_TOLERANCES:
+            try:
+                features = layer_features(source, lod)
+            except Exception as e:
+                print(f"Skipping {source} layer: {e}")
+                break
+            topology = encode_topology(features)
+            path = layer_topology_path(source, lod)
+            with open(path, 'w') as f:
+                json.dump(topology, f, separators=(',', ':'))
+            
+            geojson_size = len(json.dumps({'type': 'FeatureCollection', 'features': list(features.values())},
+                                          separators=(',', ':')))
+            topology_size = os.path.getsize(path)
+            print(f"{source} {lod}: {len(features)} shapes, {geojson_size / 1024:.0f} KB GeoJSON -> "
+                  f"{topology_size / 1024:.0f} KB TopoJSON ({geojson_size / topology_size:.1f}x)")
+
+if __name__ == '__main__':
+    build_map_layers()
@@ -2,62 +2,26 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import dash_bootstrap_components as dbc
-from dash import html, dcc
+from dash import html, dcc, dash_table
 import statistics as stat
+import hashlib
 from scipy import stats as scipystat
 import math
-import geopandas as gpd
-import json
+import re
 import numpy as np
 import warnings
+from geometry_cache import (coverage_zcta_layer, zcta_layer_for, district_layer,
+                            feature_collection, lod_for_zoom)
+from freq_cube import population_filters, cube_value_counts, cube_crosstab
 warnings.filterwarnings('ignore')
 
-# Initialize global variables for frequency functions
-hours = pd.DataFrame()
-clients = pd.DataFrame()
+# ZIP -> county lookup, set by New_Dashboard from its county_zips configuration
+zip_county_index = pd.Series(dtype=object)
 
-def update_global_dataframes(new_hours, new_clients):
-    """Update global DataFrames for frequency table functions"""
-    global hours, clients
-    
-    # Update hours DataFrame
-    hours = new_hours.copy() if not new_hours.empty else pd.DataFrame()
-    
-    # Ensure year column exists in hours DataFrame
-    if not hours.empty and 'Event Date' in hours.columns and 'year' not in hours.columns:
-        try:
-            hours['year'] = pd.to_datetime(hours['Event Date']).dt.year.astype(int)
-        except:
-            pass  # If conversion fails, continue without year column
-    
-    # Update clients DataFrame
-    clients = new_clients.copy() if not new_clients.empty else pd.DataFrame()
-    
-    # Ensure numeric columns are properly typed
-    if not clients.empty:
-        # Convert Age columns to int if they exist
-        for col in ['Age at Sign Up', 'Age Now']:
-            if col in clients.columns:
-                try:
-                    clients[col] = pd.to_numeric(clients[col], errors='coerce').astype(int)
-                except:
-                    pass
-        
-        # Convert Zip Code to int if it exists
-        if 'Zip Code' in clients.columns:
-            try:
-                clients['Zip Code'] = pd.to_numeric(clients['Zip Code'], errors='coerce').astype(int)
-            except:
-                pass
-        
-        # Ensure binary columns are regular Python integers for proper filtering
-        for col in ['Follow Through', 'Club']:
-            if col in clients.columns:
-                try:
-                    # Convert to numeric first, then to regular Python int
-                    clients[col] = pd.to_numeric(clients[col], errors='coerce').astype(int)
-                except:
-                    pass
+def zip_hover_labels(zip_codes):
+    """Label ZIP code strings with their county from zip_county_index, e.g. '78201 (Bexar)'"""
+    counties = pd.to_numeric(zip_codes, errors='coerce').map(zip_county_index)
+    return zip_codes.where(counties.isna(), zip_codes + ' (' + counties.astype(str) + ')')
 
 def create_empty_pie_chart():
     """Create empty pie chart for when no data is available"""
@@ -129,7 +93,7 @@ def create_district_heat_map(clients):
         
         # Try to read the district shapes file
         try:
-            district_shapes = gpd.read_file('School_Districts_2025_.geojson')
+            district_shapes = district_layer()
         except FileNotFoundError:
             # If the geojson file doesn't exist, create a fallback visualization
             fig = px.bar(district_counts.head(10), 
@@ -166,7 +130,6 @@ def create_district_heat_map(clients):
         # Merge data
         merged = district_shapes.merge(district_counts, left_on='NAME', right_on='Mapped_District_Name', how='left')
         merged['Client_Count'] = merged['Client_Count'].fillna(0).astype(int)
-        merged = merged.to_crs('EPSG:4326')
 
         # Use actual client count data directly for color mapping with log scaling
         min_clients = merged['Client_Count'].min()
@@ -180,11 +143,11 @@ def create_district_heat_map(clients):
         merged['Client_Count_Log'] = np.log1p(merged['Client_Count'])
 
         # Create map using log-scaled client count data with same color scale as client distribution
-        geojson = json.loads(merged.to_json())
+        geojson = feature_collection('district', merged['NAME'], lod_for_zoom(9))
         fig = px.choropleth_mapbox(
             merged,
             geojson=geojson,
-            locations=merged.index,
+            locations='NAME',
             color='Client_Count_Log',  # Use log-scaled client count data
             color_continuous_scale=['#e8f4fd', '#b3d9f2', '#80b3d9', '#4d94bf', '#1a75a6', '#005580'],
             mapbox_style="open-street-map",
@@ -243,61 +206,53 @@ def create_district_heat_map(clients):
         fig.update_xaxes(tickangle=45)
         return fig
 
+def map_geometry_key(geojson):
+    """Cache key for a map FeatureCollection: its layer, level of detail and feature ids"""
+    feature_ids = '|'.join(str(feature.get('id')) for feature in geojson['features'])
+    return hashlib.md5(f"{geojson.get('source')}|{geojson.get('lod')}|{feature_ids}".encode()).hexdigest()[:16]
+
+def split_map_geometry(fig):
+    """
+    Split a choropleth figure into its geometry and a values-only figure dict so the geometry can be
+    cached in the browser. Returns (geometry_key, geojson, figure); the key is None without geometry.
+    """
+    geojson = None
+    for trace in fig.data:
+        if getattr(trace, 'geojson', None) is not None:
+            geojson = trace.geojson
+            trace.geojson = None
+    figure = fig.to_dict()
+    if geojson is None:
+        return None, None, figure
+    
+    # Maps drawn on the same shapes at the same level of detail share one cached copy
+    return map_geometry_key(geojson), geojson, figure
+
 def create_heatmap_from_dataframe(clients_df, height=600):
     """Create heatmap from clients dataframe with colorful background and borders"""
     try:
-        # Prepare data
-        clients_data = clients_df.copy()
-        clients_data['Zip Code'] = clients_data['Zip Code'].astype(str)
-        
-        # Load ZIP shapes
-        zip_shapes = gpd.read_file("texas_zcta_2024_simplified.geojson")
+        # Coverage area ZIP shapes (loaded and reprojected once, see geometry_cache)
+        filtered_zips = coverage_zcta_layer()
         
         # Count clients per ZIP code
-        zip_counts = clients_data['Zip Code'].value_counts().reset_index()
+        zip_counts = clients_df['Zip Code'].astype(str).value_counts().reset_index()
         zip_counts.columns = ['ZIP_CODE', 'CLIENT_COUNT']
         
-        # Coverage area ZIP codes
-        coverage_zips = [
-            # Bexar County
-            '78201', '78202', '78203', '78204', '78205', '78206', '78207', '78208', '78209',
-            '78210', '78211', '78212', '78213', '78214', '78215', '78216', '78217', '78218',
-            '78219', '78220', '78221', '78222', '78223', '78224', '78225', '78226', '78227',
-            '78228', '78229', '78230', '78231', '78232', '78233', '78234', '78235', '78236',
-            '78237', '78238', '78239', '78240', '78241', '78242', '78243', '78244', '78245',
-            '78246', '78247', '78248', '78249', '78250', '78251', '78252', '78253', '78254',
-            '78255', '78256', '78257', '78258', '78259', '78260', '78261', '78263', '78264',
-            '78265', '78266', '78268', '78269', '78270', '78278', '78279', '78280', '78283',
-            '78284', '78285', '78288', '78289', '78291', '78292', '78293', '78294', '78295',
-            '78296', '78297', '78298', '78299',
-            # Surrounding counties
-            '78130', '78132', '78133', '78135',  # Comal
-            '78108', '78123', '78154', '78155',  # Guadalupe
-            '78114', '78118',                    # Wilson
-            '78016', '78017', '78073',           # Medina
-            '78006', '78015', '78024', '78025', '78070',  # Kendall
-            '78003', '78055', '78063', '78883', '78885'   # Bandera
-        ]
-        
-        # Filter and merge data
-        filtered_zips = zip_shapes[zip_shapes['ZCTA5CE20'].isin(coverage_zips)]
+        # Merge data
         merged = filtered_zips.merge(zip_counts, left_on='ZCTA5CE20', right_on='ZIP_CODE', how='left')
         merged['CLIENT_COUNT'] = merged['CLIENT_COUNT'].fillna(0)
         
-        # Ensure proper coordinate reference system
-        merged = merged.to_crs('EPSG:4326')
-        
         # Apply log scaling to client counts (add 1 to handle zeros)
         merged['CLIENT_COUNT_LOG'] = np.log1p(merged['CLIENT_COUNT'])
         
-        # Create GeoJSON
-        geojson = json.loads(merged.to_json())
+        # GeoJSON from the precompiled features, matched to locations by feature id
+        geojson = feature_collection('zcta', merged['ZCTA5CE20'], lod_for_zoom(9.2))
         
         # Create choropleth map with red gradient using log scale
         fig = px.choropleth_mapbox(
             merged,
             geojson=geojson,
-            locations=merged.index,
+            locations='ZCTA5CE20',
             color='CLIENT_COUNT_LOG',
             color_continuous_scale=['#e8f4fd', '#b3d9f2', '#80b3d9', '#4d94bf', '#1a75a6', '#005580'],
             mapbox_style="open-street-map",
@@ -311,7 +266,7 @@ def create_heatmap_from_dataframe(clients_df, height=600):
         # Update hover template and styling
         fig.update_traces(
             hovertemplate="<b>ZIP Code:</b> %{hovertext}<br><b>Client Count:</b> %{z}<extra></extra>",
-            hovertext=merged['ZCTA5CE20']
+            hovertext=zip_hover_labels(merged['ZCTA5CE20'])
         )
         # Remove colorbar
         fig.update_coloraxes(showscale=False)
@@ -371,19 +326,19 @@ def create_service_events_heatmap(hours_df, height=450):
     """Create ZIP code heatmap showing where service events were hosted with colorful background"""
     try:
         # Process hours data to count service events by ZIP code
-        hours_clean = hours_df[hours_df['zipCodeNeed'].notna()].copy()
-        hours_clean['zipCodeNeed'] = hours_clean['zipCodeNeed'].astype(str).str[:5]
+        hours_clean = hours_df[hours_df['zipCodeNeed'].notna()]
+        event_zips = hours_clean['zipCodeNeed'].astype(str).str[:5]
         
         # Count service events per ZIP code
-        event_counts = hours_clean.groupby('zipCodeNeed').agg({
+        event_counts = hours_clean.groupby(event_zips).agg({
             'Galaxy ID': 'count',  # Number of service events
             'hours': 'sum'         # Total hours served
         }).reset_index()
         event_counts.columns = ['ZIP_CODE', 'SERVICE_EVENTS', 'TOTAL_HOURS']
         
-        # Load ZIP shapes
+        # Coverage area ZIP shapes (loaded and reprojected once, see geometry_cache)
         try:
-            zip_shapes = gpd.read_file("texas_zcta_2024_simplified.geojson")
+            filtered_zips = coverage_zcta_layer()
         except:
             # If ZIP shapes not available, create a simple bar chart
             fig = px.bar(event_counts.head(20), 
@@ -393,31 +348,6 @@ def create_service_events_heatmap(hours_df, height=450):
                         labels={'SERVICE_EVENTS': 'Number of Service Events'})
             return fig
         
-        # Get coverage area ZIP codes
-        coverage_zips = [str(zip_code) for zip_code in [
-            # Bexar County (San Antonio)
-            78201, 78202, 78203, 78204, 78205, 78206, 78207, 78208, 78209,
-            78210, 78211, 78212, 78213, 78214, 78215, 78216, 78217, 78218,
-            78219, 78220, 78221, 78222, 78223, 78224, 78225, 78226, 78227,
-            78228, 78229, 78230, 78231, 78232, 78233, 78234, 78235, 78236,
-            78237, 78238, 78239, 78240, 78241, 78242, 78243, 78244, 78245,
-            78246, 78247, 78248, 78249, 78250, 78251, 78252, 78253, 78254,
-            78255, 78256, 78257, 78258, 78259, 78260, 78261, 78263, 78264,
-            78265, 78266, 78268, 78269, 78270, 78278, 78279, 78280, 78283,
-            78284, 78285, 78288, 78289, 78291, 78292, 78293, 78294, 78295,
-            78296, 78297, 78298, 78299,
-            # Surrounding counties
-            78130, 78132, 78133, 78135,  # Comal
-            78108, 78123, 78154, 78155,  # Guadalupe
-            78114, 78118,                # Wilson
-            78016, 78017, 78073,         # Medina
-            78006, 78015, 78024, 78025, 78070,  # Kendall
-            78003, 78055, 78063, 78883, 78885   # Bandera
-        ]]
-        
-        # Filter ZIP shapes to coverage area
-        filtered_zips = zip_shapes[zip_shapes['ZCTA5CE20'].isin(coverage_zips)]
-        
         # Merge with service events data
         merged = filtered_zips.merge(event_counts, left_on='ZCTA5CE20', right_on='ZIP_CODE', how='left')
         merged['SERVICE_EVENTS'] = merged['SERVICE_EVENTS'].fillna(0)
@@ -426,17 +356,14 @@ def create_service_events_heatmap(hours_df, height=450):
         # Apply log scaling to service events (add 1 to handle zeros)
         merged['SERVICE_EVENTS_LOG'] = np.log1p(merged['SERVICE_EVENTS'])
         
-        # Ensure proper coordinate reference system
-        merged = merged.to_crs('EPSG:4326')
-        
-        # Create GeoJSON
-        geojson = json.loads(merged.to_json())
+        # GeoJSON from the precompiled features, matched to locations by feature id
+        geojson = feature_collection('zcta', merged['ZCTA5CE20'], lod_for_zoom(9.2))
         
         # Create choropleth map with blue gradient using log scale
         fig = px.choropleth_mapbox(
             merged,
             geojson=geojson,
-            locations=merged.index,
+            locations='ZCTA5CE20',
             color='SERVICE_EVENTS_LOG',
             color_continuous_scale='Blues',
             mapbox_style="open-street-map",
@@ -450,7 +377,7 @@ def create_service_events_heatmap(hours_df, height=450):
         # Update hover template and styling
         fig.update_traces(
             hovertemplate="<b>ZIP Code:</b> %{hovertext}<br><b>Service Events:</b> %{customdata[0]}<br><b>Total Hours:</b> %{customdata[1]:.1f}<br><extra></extra>",
-            hovertext=merged['ZCTA5CE20'],
+            hovertext=zip_hover_labels(merged['ZCTA5CE20']),
             customdata=np.column_stack([merged['SERVICE_EVENTS'], merged['TOTAL_HOURS']])
         )
         
@@ -473,9 +400,8 @@ def create_service_events_heatmap(hours_df, height=450):
     except Exception as e:
         print(f"Error creating service events heatmap: {e}")
         # Create a simple bar chart as fallback
-        hours_clean = hours_df[hours_df['zipCodeNeed'].notna()].copy()
-        hours_clean['zipCodeNeed'] = hours_clean['zipCodeNeed'].astype(str).str[:5]
-        event_counts = hours_clean['zipCodeNeed'].value_counts().head(15)
+        event_zips = hours_df['zipCodeNeed'].dropna().astype(str).str[:5]
+        event_counts = event_zips.value_counts().head(15)
         
         fig = px.bar(
             x=event_counts.index, 
@@ -633,13 +559,15 @@ def create_monthly_volunteers_chart(hours_df):
         return empty_fig
     
     try:
-        # Create month-year column if it doesn't exist
-        if 'mon-year' not in hours_df.columns:
-            hours_df['mon-year'] = hours_df['Event Date'].dt.to_period('M').astype(str)
+        # Month keys are derived at upload (add_time_keys); older frames get them computed here
+        if 'mon-year' in hours_df.columns:
+            months = hours_df['mon-year']
+        else:
+            months = hours_df['Event Date'].dt.to_period('M').astype(str)
         
         # Create monthly volunteer counts
         mon_vol_counts = pd.DataFrame(
-            list(hours_df.groupby('mon-year')['Galaxy ID'].nunique().to_dict().items()),
+            list(hours_df.groupby(months)['Galaxy ID'].nunique().to_dict().items()),
             columns=['Month', 'Active Volunteers']
         )
         
@@ -692,171 +620,116 @@ notcollected_freq_cols = ['Age at Sign Up', 'Zip Code', 'School',
                           'District', 'Race/Ethnicity', 'Gender', 
                           'Income Range (Thousands)', 'Club', 'County']
 
-filter_populations = ['Follow Through', 'District', 'Trip Eligible (Yes/No)',
-                      'Explore Participation','Make It Happen Badge (Yes/No)','Learn Participation 2022',
-                      'Scholarship Badge (Yes/No)', 'Income Range (Thousands)', 'School', 'Gender']
-
-def slice_by_active(year):
-    hours_slice = hours[hours['year']==year]
-    active_galaxy = hours_slice['Galaxy ID'].unique()
-    active_in_year = clients[clients['Galaxy ID'].isin(active_galaxy)]
-    return active_in_year
-
-# Debug function removed - using fixed version below
-def single_var_freq(var, pop='all', pop_value=None, slice='all'):
-    
-    # Check if clients DataFrame is available and has data
-    if clients.empty:
+def single_var_freq(cube, var, pop='all', pop_value=None, slice='all', filters=()):
+    """
+    Frequency table of one variable from a dataset's frequency cube, for clients in the
+    population pop == pop_value (plus any extra (column, value) filters) active in slice
+    """
+    pop_filters = population_filters(pop, pop_value)
+    if pop_filters is None:
         return pd.DataFrame()
-        
-    if var not in clients.columns:
+    return cube_value_counts(cube, var, pop_filters + list(filters), slice)
+
+def multi_var_freq(cube, var1, var2, pop='all', pop_value=None, slice='all', filters=()):
+    """Cross-tabulation of two variables, filtered like single_var_freq"""
+    pop_filters = population_filters(pop, pop_value)
+    if pop_filters is None:
         return pd.DataFrame()
-    
-    # Convert string values to int for binary columns (Follow Through, Club)
-    # But NOT for categorical string columns like Income Range
-    if pop_value is not None and pop in ['Follow Through', 'Club']:
-        try:
-            pop_value = int(pop_value)
-        except (ValueError, TypeError):
-            pass  # Keep original value if conversion fails
-    
-    # For string-based categorical columns, ensure pop_value is treated as string
-    if pop_value is not None and pop in ['Income Range (Thousands)', 'District', 'School', 'Gender', 'Race/Ethnicity']:
-        pop_value = str(pop_value)
+    return cube_crosstab(cube, var1, var2, pop_filters + list(filters), slice)
 
-    if slice == 'all':
-        if pop == 'all':
-            freq_table = pd.DataFrame(clients[var].value_counts().sort_index().reset_index())
-        elif pop in filter_populations:
-            if pop not in clients.columns:
-                print(f"ERROR: Filter population '{pop}' not found in clients columns")
-                return pd.DataFrame()
-            
-            # Filter the data - handle string comparisons properly
-            if pop in ['Income Range (Thousands)', 'District', 'School', 'Gender', 'Race/Ethnicity']:
-                # For categorical string columns, use string comparison
-                filtered_clients = clients[clients[pop].astype(str) == str(pop_value)]
-            else:
-                # For numeric columns, use regular comparison
-                filtered_clients = clients[clients[pop] == pop_value]
-            
-            if filtered_clients.empty:
-                return pd.DataFrame()
-            
-            freq_table = pd.DataFrame(filtered_clients[var].value_counts().sort_index().reset_index())
-        else:
-            return pd.DataFrame()
+# Result tables are sent one page at a time; sorting, filtering and paging run on the server
+TABLE_PAGE_SIZE = 20
 
-    elif slice in range(2020,2100):
-        sliced_clients = slice_by_active(slice)
-        if sliced_clients.empty:
-            return pd.DataFrame()
-            
-        if pop == 'all':
-            freq_table = pd.DataFrame(sliced_clients[var].value_counts().sort_index().reset_index())
-        elif pop in filter_populations:
-            if pop not in sliced_clients.columns:
-                return pd.DataFrame()
-            
-            # Filter the data - handle string comparisons properly
-            if pop in ['Income Range (Thousands)', 'District', 'School', 'Gender', 'Race/Ethnicity']:
-                # For categorical string columns, use string comparison
-                filtered_sliced = sliced_clients[sliced_clients[pop].astype(str) == str(pop_value)]
-            else:
-                # For numeric columns, use regular comparison
-                filtered_sliced = sliced_clients[sliced_clients[pop] == pop_value]
-            
-            if filtered_sliced.empty:
-                return pd.DataFrame()
-            
-            freq_table = pd.DataFrame(filtered_sliced[var].value_counts().sort_index().reset_index())
-        else:
-            return pd.DataFrame()
+# DataTable filter expressions, e.g. "{Count} >= 5" or "{School} icontains lee"
+_filter_expression = re.compile(r'\{(?P<column>[^}]*)\}\s+(?P<case>[is]?)(?P<operator>contains|datestartswith|eq|ne|lt|le|gt|ge|>=|<=|!=|=|<|>)\s+(?P<value>.*)')
+_comparisons = {'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+
+def _flat_table(df):
+    """Table with string column ids (nested column labels joined by '_'), and the header names for each id"""
+    flat = df.copy(deep=False)
+    if isinstance(df.columns, pd.MultiIndex):
+        parts = [[str(part) for part in col] for col in df.columns]
+        flat.columns = ['_'.join(part for part in col if part != '') for col in parts]
+        # Blank lower levels (e.g. the reset index column) repeat the top label so merged headers span them
+        names = [[part if part != '' else col[0] for part in col] for col in parts]
     else:
-        return pd.DataFrame()
+        flat.columns = [str(col) for col in df.columns]
+        names = [[col] for col in flat.columns]
+    return flat, names
 
-    return freq_table
+def _apply_filter(df, filter_query):
+    """Rows of df matching a DataTable filter_query ('&&'-joined column expressions)"""
+    for part in (filter_query or '').split(' && '):
+        match = _filter_expression.match(part.strip())
+        if not match or match.group('column') not in df.columns:
+            continue
+        column = df[match.group('column')]
+        operator = _comparisons.get(match.group('operator'), match.group('operator'))
+        case = match.group('case') != 'i'
+        value = match.group('value').strip()
+        if len(value) > 1 and value[0] == value[-1] and value[0] in '"\'`':
+            value = value[1:-1]
 
-def multi_var_freq(var1, var2, pop='all', pop_value=None, slice='all'):
-    
-    # Check if clients DataFrame is available and has data
-    if clients.empty:
-        return pd.DataFrame()
-        
-    if var1 not in clients.columns or var2 not in clients.columns:
-        return pd.DataFrame()
+        text = column.astype(str) if case else column.astype(str).str.lower()
+        needle = value if case else value.lower()
+        if operator == 'contains':
+            keep = text.str.contains(needle, regex=False)
+        elif operator == 'datestartswith':
+            keep = text.str.startswith(needle)
+        else:
+            number = pd.to_numeric(pd.Series([value]), errors='coerce').iloc[0]
+            left, right = (pd.to_numeric(column, errors='coerce'), number) if pd.notna(number) else (text, needle)
+            keep = {'=': left == right, '!=': left != right, '<': left < right,
+                    '<=': left <= right, '>': left > right, '>=': left >= right}[operator]
+        df = df[keep.fillna(False).to_numpy(dtype=bool)]
+    return df
+
+def table_page(df, page_current=0, page_size=TABLE_PAGE_SIZE, sort_by=None, filter_query=None):
+    """
+    One page of a result table after a DataTable's filter and sort: (records, page_count, page_current).
+    page_current is clamped to the last page, so the table can be moved there when a filter shrinks it.
+    """
+    flat, _ = _flat_table(df)
+    flat = _apply_filter(flat, filter_query)
     
-    # Convert string values to int for binary columns (Follow Through, Club)
-    # But NOT for categorical string columns like Income Range
-    if pop_value is not None and pop in ['Follow Through', 'Club']:
+    sort_by = [s for s in (sort_by or []) if s.get('column_id') in flat.columns]
+    if sort_by:
+        by = [s['column_id'] for s in sort_by]
+        ascending = [s.get('direction') != 'desc' for s in sort_by]
         try:
-            pop_value = int(pop_value)
-        except (ValueError, TypeError):
-            pass  # Keep original value if conversion fails
-    
-    # For string-based categorical columns, ensure pop_value is treated as string
-    if pop_value is not None and pop in ['Income Range (Thousands)', 'District', 'School', 'Gender', 'Race/Ethnicity']:
-        pop_value = str(pop_value)
+            flat = flat.sort_values(by=by, ascending=ascending, kind='mergesort')
+        except TypeError:
+            # Columns mixing numbers and text sort as text
+            flat = flat.sort_values(by=by, ascending=ascending, kind='mergesort', key=lambda col: col.astype(str))
     
-    if slice == 'all':
-        if pop == 'all':
-            freq_table = pd.crosstab(clients[var1], clients[var2])
-        elif pop in filter_populations:
-            if pop not in clients.columns:
-                return pd.DataFrame()
-            
-            # Filter the data - handle string comparisons properly
-            if pop in ['Income Range (Thousands)', 'District', 'School', 'Gender', 'Race/Ethnicity']:
-                # For categorical string columns, use string comparison
-                filtered_clients = clients[clients[pop].astype(str) == str(pop_value)]
-            else:
-                # For numeric columns, use regular comparison
-                filtered_clients = clients[clients[pop] == pop_value]
-            
-            if filtered_clients.empty:
-                return pd.DataFrame()
-            
-            freq_table = pd.crosstab(filtered_clients[var1], filtered_clients[var2])
-        else:
-            return pd.DataFrame()
+    page_size = page_size or TABLE_PAGE_SIZE
+    page_count = max(1, math.ceil(len(flat) / page_size))
+    page_current = min(page_current or 0, page_count - 1)
+    start = page_current * page_size
+    return flat.iloc[start:start + page_size].to_dict('records'), page_count, page_current
 
-    elif slice in range(2020,2100):
-        sliced_clients = slice_by_active(slice)
-        if sliced_clients.empty:
-            return pd.DataFrame()
-            
-        if pop == 'all':
-            freq_table = pd.crosstab(sliced_clients[var1], sliced_clients[var2])
-        elif pop in filter_populations:
-            if pop not in sliced_clients.columns:
-                return pd.DataFrame()
-            
-            # Filter the data - handle string comparisons properly
-            if pop in ['Income Range (Thousands)', 'District', 'School', 'Gender', 'Race/Ethnicity']:
-                # For categorical string columns, use string comparison
-                filtered_sliced = sliced_clients[sliced_clients[pop].astype(str) == str(pop_value)]
-            else:
-                # For numeric columns, use regular comparison
-                filtered_sliced = sliced_clients[sliced_clients[pop] == pop_value]
-            
-            if filtered_sliced.empty:
-                return pd.DataFrame()
-            
-            freq_table = pd.crosstab(filtered_sliced[var1], filtered_sliced[var2])
-        else:
-            return pd.DataFrame()
-    else:
-        return pd.DataFrame()
-
-    return freq_table 
+def paged_table(table_id, df, page_size=TABLE_PAGE_SIZE):
+    """DataTable showing the first page of df, with paging, sorting and filtering handled by a server callback"""
+    flat, names = _flat_table(df)
+    records, page_count, _ = table_page(df, 0, page_size)
+    return dash_table.DataTable(
+        id=table_id,
+        columns=[{'name': name if len(name) > 1 else name[0], 'id': col} for col, name in zip(flat.columns, names)],
+        data=records,
+        page_action='custom', page_current=0, page_size=page_size, page_count=page_count,
+        sort_action='custom', sort_mode='multi', sort_by=[],
+        filter_action='custom', filter_query='',
+        merge_duplicate_headers=True,
+        style_table={'overflowX': 'auto'},
+        style_cell={'fontSize': '12px', 'fontFamily': 'inherit', 'padding': '4px 8px', 'textAlign': 'left'},
+        style_header={'fontWeight': 'bold', 'backgroundColor': '#f8f9fa'},
+        style_data_conditional=[{'if': {'row_index': 'odd'}, 'backgroundColor': '#f9f9f9'}]
+    )
 
-def create_zipcode_map():
+def create_zipcode_map(clients, hours, volunteer_service):
     """
     Create a heat map showing service hours by zipcode
     """
-    # Access global variables
-    global clients, hours
-    
     # Check if data is available
     if clients.empty or hours.empty:
         # Create empty map if no data
@@ -877,15 +750,11 @@ def create_zipcode_map():
     try:
         print(f"Creating zipcode map - clients shape: {clients.shape}, hours shape: {hours.shape}")
         
-        # Calculate total hours per Galaxy ID
-        hours_sum = hours.groupby('Galaxy ID')['hours'].sum().reset_index()
-        hours_sum.columns = ['Galaxy ID', 'Total Hours']
-        
-        # Merge clients with their total hours
-        clients_with_hours = clients.merge(hours_sum, on='Galaxy ID', how='left')
+        # Total hours per client come from the per-volunteer rollup built at upload
+        client_hours = clients['Galaxy ID'].map(volunteer_service['Total Hours']).rename('Total Hours')
         
         # Group by zipcode and sum hours
-        zipcode_hours = clients_with_hours.groupby('Zip Code')['Total Hours'].sum().reset_index()
+        zipcode_hours = client_hours.groupby(clients['Zip Code']).sum().reset_index()
         zipcode_hours = zipcode_hours[zipcode_hours['Total Hours'] > 0]  # Only zipcodes with hours
         
         if zipcode_hours.empty:
@@ -904,13 +773,11 @@ def create_zipcode_map():
             )
             return fig
         
-        # Load Texas zipcode geojson
-        gdf = gpd.read_file('texas_zcta_2024_simplified.geojson')
-        gdf['ZCTA5CE20'] = pd.to_numeric(gdf['ZCTA5CE20'], errors='coerce')
-        
         # Convert zip codes to string for matching
         zipcode_hours['Zip Code'] = zipcode_hours['Zip Code'].astype(int).astype(str)
-        gdf['ZCTA5CE20'] = gdf['ZCTA5CE20'].astype(int).astype(str)
+        
+        # Coverage area ZIP shapes plus any other ZIPs with service hours
+        gdf = zcta_layer_for(zipcode_hours['Zip Code'])
         
         # Merge with our data
         merged = gdf.merge(zipcode_hours, left_on='ZCTA5CE20', right_on='Zip Code', how='left')
@@ -919,14 +786,14 @@ def create_zipcode_map():
         # Apply log scaling to total hours (add 1 to handle zeros)
         merged['Total Hours Log'] = np.log1p(merged['Total Hours'])
         
-        merged = merged.to_crs('EPSG:4326')
-        geojson = json.loads(merged.to_json())
+        # GeoJSON from the precompiled features, matched to locations by feature id
+        geojson = feature_collection('zcta', merged['ZCTA5CE20'], lod_for_zoom(9.2))
         
         # Create the map using log scale
         fig = px.choropleth_mapbox(
             merged,
             geojson=geojson,
-            locations=merged.index,
+            locations='ZCTA5CE20',
             color='Total Hours Log',
             color_continuous_scale=[
                 '#e0fff4',  # very light mint
@@ -946,7 +813,7 @@ def create_zipcode_map():
         # Update hover template and styling
         fig.update_traces(
             hovertemplate="<b>ZIP Code:</b> %{hovertext}<br><b>Total Hours:</b> %{z}<extra></extra>",
-            hovertext=merged['ZCTA5CE20']
+            hovertext=zip_hover_labels(merged['ZCTA5CE20'])
         )
         
         # Update layout for consistent styling
@@ -999,13 +866,10 @@ def create_zipcode_map():
             fig.update_layout(height=600)
             return fig 
 
-def create_funnel_chart():
+def create_funnel_chart(clients, hours):
     """
     Create a funnel chart showing student progression through volunteer stages
     """
-    # Access global variables
-    global clients, hours
-    
     # Check if data is available
     if clients.empty:
         # Create empty funnel if no data
@@ -1,14 +1,138 @@
 import pandas as pd
 import datetime as dt
 import numpy as np
+import importlib.util
+import io
+from ingest_stats import IngestStats
 
-def process_uploaded_data(clients_raw, hours, survey_raw, county_zips, zip_incomes, county_incomes, 
-                         schools_with_clubs, yes_no_cols):
+def excel_engine():
+    """Pick the Excel reader backend: python-calamine when installed, otherwise openpyxl"""
+    if importlib.util.find_spec('python_calamine') is not None:
+        return 'calamine'
+    return 'openpyxl'
+
+def read_workbook_sheets(decoded, sheet_names):
+    """
+    Parse an uploaded workbook once and pull every requested sheet out of it.
+    Returns the workbook's sheet names and a dict of the requested sheets that exist.
+    """
+    try:
+        excel_file = pd.ExcelFile(io.BytesIO(decoded), engine=excel_engine())
+    except ValueError:
+        # Older pandas versions do not know the calamine engine
+        excel_file = pd.ExcelFile(io.BytesIO(decoded), engine='openpyxl')
+    
+    with excel_file:
+        available = excel_file.sheet_names
+        sheets = {name: excel_file.parse(name) for name in sheet_names if name in available}
+    
+    return available, sheets
+
+def build_zip_county_index(county_zips):
+    """
+    Invert the county -> ZIP lists into a ZIP -> county lookup Series.
+    A ZIP listed under several counties keeps the first county, matching the old per-client scan.
+    """
+    zip_county = {}
+    for county, zips in county_zips.items():
+        for zip_code in zips:
+            zip_county.setdefault(zip_code, county)
+    return pd.Series(zip_county, name='County', dtype=object)
+
+def summarize_volunteer_service(hours):
+    """
+    Roll the service hours sheet up to one row per volunteer (Galaxy ID):
+    total hours, first and last service dates, event count and distinct service ZIPs.
+    """
+    rollup = hours.groupby('Galaxy ID').agg(**{
+        'Total Hours': ('hours', 'sum'),
+        'Earliest Service': ('Event Date', 'min'),
+        'Latest Service': ('Event Date', 'max'),
+        'Service Count': ('Event Date', 'count')
+    })
+    
+    # ZIP 0 marks virtual/other events, so it does not count as a service ZIP
+    if 'zipCodeNeed' in hours.columns:
+        service_zips = hours['zipCodeNeed'].where(hours['zipCodeNeed'] != 0)
+        rollup['Service Zips'] = service_zips.groupby(hours['Galaxy ID']).nunique()
+    
+    return rollup
+
+def build_active_year_index(clients, hours):
+    """
+    One boolean column per service year (named by the year as a string), aligned with clients' rows:
+    True where the client logged service hours in that year.
+    """
+    galaxy_ids = clients['Galaxy ID']
+    active = hours[['year', 'Galaxy ID']].dropna().drop_duplicates()
+    masks = {str(int(year)): galaxy_ids.isin(ids).to_numpy()
+             for year, ids in active.groupby('year')['Galaxy ID']}
+    return pd.DataFrame(masks, index=clients.index)
+
+def _smallest_int_dtype(values, nullable):
+    """Smallest integer dtype holding every value (nullable pandas dtypes when there are missing values)"""
+    low, high = values.min(), values.max()
+    for bits in (8, 16, 32, 64):
+        info = np.iinfo(f'int{bits}')
+        if info.min <= low and high <= info.max:
+            return f'Int{bits}' if nullable else f'int{bits}'
+    return 'Int64' if nullable else 'int64'
+
+def compact_dtypes(df, max_category_ratio=0.5):
+    """
+    Shrink a cleaned frame's dtypes: low-cardinality text columns become categoricals, integer
+    columns (including whole numbers stored as objects) the smallest integer type that fits,
+    and durations whole days. Floats and dates are left as they are.
+    """
+    # Columns are replaced, never written into, so a shallow copy leaves df untouched
+    df = df.copy(deep=False)
+    for col in df.columns:
+        series = df[col]
+        values = series.dropna()
+        if pd.api.types.is_timedelta64_dtype(series):
+            days = series.dt.days
+            df[col] = days.astype(_smallest_int_dtype(days.dropna(), True)) if days.notna().any() else days
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            continue
+        elif series.dtype == object:
+            kind = pd.api.types.infer_dtype(values, skipna=True)
+            # All-null columns stay as they are: an empty categorical does not survive the Parquet cache
+            if kind == 'string' and values.nunique() <= max(1, max_category_ratio * len(values)):
+                df[col] = series.astype('category')
+            elif kind == 'integer':
+                df[col] = series.astype(_smallest_int_dtype(values, True))
+        elif pd.api.types.is_integer_dtype(series) and len(values):
+            df[col] = series.astype(_smallest_int_dtype(values, not isinstance(series.dtype, np.dtype)))
+    return df
+
+def add_time_keys(hours):
+    """Service hours with the derived time keys ('year', 'month', 'qtr-year', 'mon-year') added, as a new frame"""
+    event_date = hours['Event Date'].dt
+    return hours.assign(**{
+        'year': event_date.year,
+        'month': event_date.month,
+        'qtr-year': event_date.year.astype(str) + '-Q' + event_date.quarter.astype(str),
+        'mon-year': event_date.to_period('M').astype(str)
+    })
+
+def process_uploaded_data(clients_raw, hours, survey_raw, zip_county_index, zip_incomes, county_incomes, 
+                         schools_with_clubs, yes_no_cols, progress=None, stats=None):
     """
-    Process uploaded data and return cleaned datasets
+    Process uploaded data and return the cleaned datasets as a dict of frames
+    ('clients', 'hours', 'schoolclub_hours', 'qtr_vol_counts', 'volunteer_service', 'active_years').
+    The input frames are not modified; the returned hours carry the derived time keys (add_time_keys).
+    progress, if given, is called with the name of each stage ('cleaning', 'geography', 'aggregates') as it starts.
+    stats, if given, is an IngestStats that records the time, rows and memory of each of those stages,
+    plus dtype compaction ('compaction').
     """
+    if progress is None:
+        progress = lambda stage: None
+    if stats is None:
+        stats = IngestStats()
     
     # Clean clients dataset
+    progress('cleaning')
+    stats.start('cleaning', rows_in=len(clients_raw))
     clients = (clients_raw[clients_raw['Galaxy ID'].notna()]
                           .replace({'HS Graduation Year': '0', 'Age Now': 'Unknown'}, None)
                           .replace({'Age at Sign Up': {"Unknown": 15, 0: 15, 1: 15, 4: 15}})
@@ -24,18 +148,12 @@ def process_uploaded_data(clients_raw, hours, survey_raw, county_zips, zip_incom
     # Convert zip codes to numeric, handling errors
     clients['Zip Code'] = pd.to_numeric(clients['Zip Code'].astype(str).str[:5], errors='coerce')
     
-    # Recalculate derived columns
-    hours_sum = hours.groupby('Galaxy ID')['hours'].sum()
-    clients['Collected Hours'] = clients['Galaxy ID'].map(hours_sum)
-    
-    earliest_service = hours.groupby('Galaxy ID')['Event Date'].min()
-    clients['Earliest Service'] = clients['Galaxy ID'].map(earliest_service)
-    
-    latest_service = hours.groupby('Galaxy ID')['Event Date'].max()
-    clients['Latest Service'] = clients['Galaxy ID'].map(latest_service)
-    
-    service_count = hours.groupby('Galaxy ID')['Event Date'].count()
-    clients['Service Count'] = clients['Galaxy ID'].map(service_count)
+    # Recalculate derived columns from the per-volunteer rollup
+    volunteer_service = summarize_volunteer_service(hours)
+    clients['Collected Hours'] = clients['Galaxy ID'].map(volunteer_service['Total Hours'])
+    clients['Earliest Service'] = clients['Galaxy ID'].map(volunteer_service['Earliest Service'])
+    clients['Latest Service'] = clients['Galaxy ID'].map(volunteer_service['Latest Service'])
+    clients['Service Count'] = clients['Galaxy ID'].map(volunteer_service['Service Count'])
     
     range_mask = (clients['Latest Service'] - clients['Earliest Service']).dt.days > 0
     clients.loc[range_mask, 'Service Range'] = clients['Latest Service'] - clients['Earliest Service']
@@ -43,39 +161,26 @@ def process_uploaded_data(clients_raw, hours, survey_raw, county_zips, zip_incom
     clients['Follow Through'] = np.where(clients['Hours'] > 0, 1, 0).astype(int)
     clients['Club'] = np.where(clients['School'].isin(schools_with_clubs), 1, 0).astype(int)
     
-    # Assign counties
-    def county_assign(zip_code):
-        for county, zips in county_zips.items():
-            if zip_code in zips:
-                return county
-        return None
-    
-    clients['County'] = clients['Zip Code'].apply(county_assign)
-    
-    # Assign incomes
-    def assign_zipincome(zip_code):
-        if zip_code in zip_incomes['Zip Code'].values:
-            return round(int(zip_incomes[zip_incomes['Zip Code'] == zip_code]['Median Income'].values[0]))
-        return None
-    
-    def assign_countyincome(county):
-        if county in county_incomes['County'].values:
-            return round(int(county_incomes[county_incomes['County'] == county]['Median Income'].values[0]))
-        return None
-    
-    for idx, row in clients.iterrows():
-        zip_of_id = row['Zip Code']
-        county_of_id = row['County']
-        
-        if zip_of_id in zip_incomes['Zip Code'].values:
-            clients.loc[idx, 'Median Family Income'] = assign_zipincome(zip_of_id)
-        elif county_of_id in county_incomes['County'].values:
-            clients.loc[idx, 'Median Family Income'] = assign_countyincome(county_of_id)
-        else:
-            clients.loc[idx, 'Median Family Income'] = None
+    stats.finish(rows_out=len(clients))
+    progress('geography')
+    stats.start('geography', rows_in=len(clients))
+    # Assign counties - unknown ZIPs map to missing values
+    county = clients['Zip Code'].map(zip_county_index)
+    clients['County'] = county.astype('category')
+    
+    # Assign incomes - indexed lookup by ZIP, falling back to the county median
+    zip_income_lookup = (zip_incomes.drop_duplicates('Zip Code')
+                                    .set_index('Zip Code')['Median Income']
+                                    .astype(int))
+    county_income_lookup = (county_incomes.drop_duplicates('County')
+                                          .set_index('County')['Median Income']
+                                          .astype(int))
+    
+    zip_income = clients['Zip Code'].map(zip_income_lookup)
+    county_income = county.map(county_income_lookup)
     
-    # Convert Median Family Income to int, handling None values
-    clients['Median Family Income'] = pd.to_numeric(clients['Median Family Income'], errors='coerce').astype('Int64')
+    # Convert Median Family Income to int, handling missing values
+    clients['Median Family Income'] = pd.to_numeric(zip_income.fillna(county_income), errors='coerce').astype('Int64')
     
     # Create income range function
     def income_range(income):
@@ -93,37 +198,69 @@ def process_uploaded_data(clients_raw, hours, survey_raw, county_zips, zip_incom
     
     clients['Income Range (Thousands)'] = clients['Median Family Income'].apply(income_range)
     
+    stats.finish(rows_out=len(clients))
+    stats.start('compaction', rows_in=len(clients))
+    # Compact dtypes (categoricals, small ints, Service Range in days) before anything is aggregated
+    before = clients.memory_usage(deep=True).sum()
+    clients = compact_dtypes(clients)
+    after = clients.memory_usage(deep=True).sum()
+    
+    # The memory saved is reported with the stage (upload summary and INGEST_STATS log line)
+    stats.finish(rows_out=len(clients), bytes_before=int(before), bytes_after=int(after))
+    progress('aggregates')
+    stats.start('aggregates', rows_in=len(hours))
     # Create school club data
-    schoolclub_hours = clients.groupby(by='School').agg({'Hours': 'sum'}).reset_index()
+    schoolclub_hours = clients.groupby(by='School', observed=True).agg({'Hours': 'sum'}).reset_index()
     schoolclub_hours['Club'] = np.where(schoolclub_hours['School'].isin(schools_with_clubs), 1, 0).astype(str)
     
-    hours['year'] = hours['Event Date'].dt.year
-    hours['month'] = hours['Event Date'].dt.month
-    # Update quarter data
-    hours['qtr-year'] = (
-        hours['Event Date'].dt.year.astype(str) +
-        '-Q' + hours['Event Date'].dt.quarter.astype(str)
-    )
+    # Time keys are derived once here; views group by them instead of adding columns later
+    hours = add_time_keys(hours)
     
     qtr_vol_counts = pd.DataFrame(
         list(hours.groupby('qtr-year')['Galaxy ID'].nunique().to_dict().items()),
         columns=['QTR', 'Active Volunteers']
     )
     
-    return clients, schoolclub_hours, qtr_vol_counts
+    active_years = build_active_year_index(clients, hours)
+    stats.finish(rows_out=len(qtr_vol_counts))
+    
+    return {
+        'clients': clients,
+        'hours': hours,
+        'schoolclub_hours': schoolclub_hours,
+        'qtr_vol_counts': qtr_vol_counts,
+        'volunteer_service': volunteer_service,
+        'active_years': active_years
+    }
 
-def create_processing_summary(clients_raw, hours, survey_raw, clients, schoolclub_hours, qtr_vol_counts, filename):
-    """Create detailed processing summary for successful upload"""
-    from dash import html
-    import dash_bootstrap_components as dbc
+def summarize_processing(clients_raw, hours, survey_raw, clients, schoolclub_hours, qtr_vol_counts):
+    """Figures shown in the processing summary, as plain values so they can be kept with the upload result"""
     from dashboard_components import calculate_hours_value
     
-    # Calculate metrics
-    follow_through_rate = clients['Follow Through'].mean() * 100 if not clients.empty else 0
     avg_hours = clients[clients['Hours'] > 0]['Hours'].mean() if not clients.empty else 0
-    total_value = calculate_hours_value(clients)
-    schools_with_clubs_count = len(schoolclub_hours[schoolclub_hours['Club'] == '1']) if not schoolclub_hours.empty else 0
-    total_schools = len(schoolclub_hours) if not schoolclub_hours.empty else 0
+    return {
+        'raw_clients': len(clients_raw),
+        'hours_records': len(hours),
+        'survey_responses': len(survey_raw),
+        'clients': len(clients),
+        'quarters': len(qtr_vol_counts),
+        'follow_through_rate': float(clients['Follow Through'].mean() * 100) if not clients.empty else 0.0,
+        'avg_hours': float(avg_hours) if pd.notna(avg_hours) else 0.0,
+        'total_value': calculate_hours_value(clients),
+        'schools_with_clubs': len(schoolclub_hours[schoolclub_hours['Club'] == '1']) if not schoolclub_hours.empty else 0,
+        'total_schools': len(schoolclub_hours) if not schoolclub_hours.empty else 0
+    }
+
+def create_processing_summary(summary_values, filename):
+    """Create detailed processing summary for successful upload from summarize_processing's figures"""
+    from dash import html
+    import dash_bootstrap_components as dbc
+    
+    follow_through_rate = summary_values['follow_through_rate']
+    avg_hours = summary_values['avg_hours']
+    total_value = summary_values['total_value']
+    schools_with_clubs_count = summary_values['schools_with_clubs']
+    total_schools = summary_values['total_schools']
     
     summary = html.Div([
         dbc.Alert([
@@ -132,7 +269,8 @@ def create_processing_summary(clients_raw, hours, survey_raw, clients, schoolclu
             html.Br(),
             f"📁 Uploaded: {filename}",
             html.Br(),
-            f"📊 Raw data loaded: {len(clients_raw)} clients, {len(hours)} service hours, {len(survey_raw)} survey responses"
+            f"📊 Raw data loaded: {summary_values['raw_clients']} clients, {summary_values['hours_records']} service hours, "
+            f"{summary_values['survey_responses']} survey responses"
         ], color="success", className="mb-2"),
         
         dbc.Alert([
@@ -140,10 +278,10 @@ def create_processing_summary(clients_raw, hours, survey_raw, clients, schoolclu
             html.Strong("Data Cleaning Pipeline Completed Successfully!"),
             html.Br(),
             html.Ul([
-                html.Li(f"✅ Filtered clients: {len(clients)} records after cleaning"),
+                html.Li(f"✅ Filtered clients: {summary_values['clients']} records after cleaning"),
                 html.Li(f"✅ Generated derived columns: Service Range, Follow Through, Club status"),
                 html.Li(f"✅ Assigned geographic data: Counties and income ranges"),
-                html.Li(f"✅ Calculated quarter aggregations: {len(qtr_vol_counts)} quarters"),
+                html.Li(f"✅ Calculated quarter aggregations: {summary_values['quarters']} quarters"),
                 html.Li(f"✅ School club analysis: {total_schools} schools processed"),
                 html.Li(f"✅ Confidence intervals calculated (α=0.05)")
             ], className="mb-2"),
@@ -167,4 +305,37 @@ def create_processing_summary(clients_raw, hours, survey_raw, clients, schoolclu
         ], color="primary")
     ])
     
-    return summary 
\ No newline at end of file
+    return summary 
+
+def create_stage_summary(stages):
+    """Table of the time, rows and peak memory growth of each ingest stage"""
+    from dash import html
+    import dash_bootstrap_components as dbc
+    
+    def rows(value):
+        return f"{value:,}" if value is not None else "-"
+    
+    table = pd.DataFrame({
+        'Stage': [stage['stage'].title() for stage in stages],
+        'Time (s)': [f"{stage['seconds']:.3f}" for stage in stages],
+        'Rows In': [rows(stage['rows_in']) for stage in stages],
+        'Rows Out': [rows(stage['rows_out']) for stage in stages],
+        'Peak Memory (MB)': [f"{stage['peak_mb']:.1f}" if stage['peak_mb'] is not None else "-" for stage in stages]
+    })
+    total_seconds = sum(stage['seconds'] for stage in stages)
+    
+    # Memory saved by compacting the cleaned clients frame's dtypes (not measured for cached uploads)
+    compaction = html.Div()
+    for stage in stages:
+        if 'bytes_before' in stage:
+            before, after = stage['bytes_before'], stage['bytes_after']
+            compaction = html.P(f"🗜️ Compacted clients: {before / 1e6:.2f} MB -> {after / 1e6:.2f} MB "
+                                f"({1 - after / max(before, 1):.0%} saved)",
+                                className="mt-2 mb-0", style={'fontSize': '14px'})
+    
+    return dbc.Alert([
+        html.I(className="fas fa-stopwatch me-2"),
+        html.Strong(f"Processing Stages ({total_seconds:.2f}s total)"),
+        dbc.Table.from_dataframe(table, size="sm", striped=True, className="mt-2 mb-0"),
+        compaction
+    ], color="light", className="mb-2")
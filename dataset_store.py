@@ -0,0 +1,168 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+import pandas as pd
+from upload_cache import CACHE_DIR, load_cached_frames
+from freq_cube import build_frequency_cube, cube_nbytes
+from popstats import build_population_stats
+
+# Memory budget for processed datasets held in this process, overridable from the environment
+DATASET_MEMORY_BUDGET = int(float(os.environ.get('SOS_DATASET_MEMORY_MB', 1024)) * 1024 * 1024)
+
+# Frames a dataset keeps in memory (the raw clients sheet is only needed for the upload summary)
+DATASET_FRAMES = ('clients', 'hours', 'survey_raw', 'schoolclub_hours', 'qtr_vol_counts', 'volunteer_service',
+                  'active_years')
+
+# Session -> upload pointers live on disk next to the upload cache so every worker process
+# behind a WSGI server resolves the same dataset for a session
+SESSION_DIR = os.environ.get('SOS_SESSION_DIR', os.path.join(CACHE_DIR, 'sessions'))
+SESSION_TTL = float(os.environ.get('SOS_SESSION_TTL_HOURS', 24)) * 3600
+
+# Loaded datasets are shared by every session and callback thread. With copy-on-write, frames derived
+# from them (columns, selections, assign/replace results) never write back into the shared frames,
+# so callbacks need no defensive copies. Set here, by the module that relies on it, so it holds for
+# every importer. This is process-wide.
+pd.set_option('mode.copy_on_write', True)
+
+# digest -> {'frames': read-only mapping of frames, 'nbytes': ...}, least recently used first.
+# Callbacks must not modify the frames themselves; anything derived from them is an independent frame.
+_loaded_datasets = OrderedDict()
+
+_lock = threading.RLock()
+
+# Dataset used before a session has uploaded anything; built once, since it is read-only and shared
+EMPTY_DATASET = MappingProxyType({
+    'clients': pd.DataFrame(),
+    'hours': pd.DataFrame(),
+    'survey_raw': pd.DataFrame(),
+    'schoolclub_hours': pd.DataFrame(columns=['School', 'Hours', 'Club']),
+    'qtr_vol_counts': pd.DataFrame(columns=['QTR', 'Active Volunteers']),
+    'volunteer_service': pd.DataFrame(columns=['Total Hours', 'Earliest Service', 'Latest Service', 'Service Count']),
+    'active_years': pd.DataFrame(),
+    'freq_cube': build_frequency_cube(pd.DataFrame(), pd.DataFrame()),
+    'popstats': {},
+    'digest': None
+})
+
+def _frames_nbytes(frames):
+    total = sum(df.memory_usage(deep=True).sum() for df in frames.values() if isinstance(df, pd.DataFrame))
+    total += sum(df.memory_usage(deep=True).sum() for df in frames.get('popstats', {}).values())
+    if 'freq_cube' in frames:
+        total += cube_nbytes(frames['freq_cube'])
+    return int(total)
+
+def _evict(keep=None):
+    """Drop least recently used datasets until the budget is met, never dropping `keep`"""
+    total = sum(entry['nbytes'] for entry in _loaded_datasets.values())
+    for digest in list(_loaded_datasets):
+        if total <= DATASET_MEMORY_BUDGET:
+            break
+        if digest == keep:
+            continue
+        total -= _loaded_datasets.pop(digest)['nbytes']
+
+def _load(digest, frames=None):
+    """Return the in-memory dataset for a digest, reading it from the upload cache if needed"""
+    with _lock:
+        if digest in _loaded_datasets:
+            _loaded_datasets.move_to_end(digest)
+            return _loaded_datasets[digest]['frames']
+
+    if frames is None:
+        frames = load_cached_frames(digest)
+        if frames is None:
+            return None
+    frames = {name: frames[name] for name in DATASET_FRAMES}
+    # Frequency tables are answered from counts aggregated once per dataset
+    frames['freq_cube'] = build_frequency_cube(frames['clients'], frames['active_years'])
+    # Population statistics tables for every dropdown column, so the dropdown only picks one
+    frames['popstats'] = build_population_stats(frames['clients'])
+    # The upload these frames came from, which keys anything cached from them
+    frames['digest'] = digest
+    # Datasets are shared by every session and callback thread, so they are handed out read-only
+    frames = MappingProxyType(frames)
+
+    with _lock:
+        _loaded_datasets[digest] = {'frames': frames, 'nbytes': _frames_nbytes(frames)}
+        _loaded_datasets.move_to_end(digest)
+        _evict(keep=digest)
+    return frames
+
+def _session_path(session_id):
+    # Session ids come from the browser, so keep only filename-safe characters
+    return os.path.join(SESSION_DIR, re.sub(r'[^A-Za-z0-9_-]', '', str(session_id))[:64] + '.json')
+
+def _read_session_upload(session_id):
+    if not session_id:
+        return None
+    try:
+        with open(_session_path(session_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_session_upload(session_id, upload):
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.session-', dir=SESSION_DIR)
+    with os.fdopen(fd, 'w') as f:
+        json.dump(upload, f)
+    os.replace(tmp, _session_path(session_id))
+
+def _touch_session_upload(session_id):
+    """Mark a session as used now, so its pointer expires SESSION_TTL after the last use rather than the upload"""
+    path = _session_path(session_id)
+    try:
+        # Refreshed at most once a minute rather than on every callback
+        if time.time() - os.path.getmtime(path) > 60:
+            os.utime(path)
+    except OSError:
+        pass
+
+def prune_sessions(max_age=None):
+    """Remove session pointers that have not been used within max_age seconds"""
+    max_age = SESSION_TTL if max_age is None else max_age
+    if not os.path.isdir(SESSION_DIR):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(SESSION_DIR):
+        path = os.path.join(SESSION_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+def register_session_dataset(session_id, digest, filename, frames=None):
+    """
+    Point a session at an uploaded dataset. frames may be passed when they are already loaded;
+    otherwise they are read from the upload cache. Returns the dataset frames, or None if unavailable.
+    """
+    dataset = _load(digest, frames)
+    if dataset is None:
+        return None
+    try:
+        _write_session_upload(session_id, {'digest': digest, 'filename': filename, 'uploaded_at': time.time()})
+    except OSError as e:
+        print(f"Could not record upload for session: {e}")
+        return None
+    prune_sessions()
+    return dataset
+
+def get_session_dataset(session_id):
+    """
+    Resolve the caller's dataset; sessions without an upload (or whose upload is no longer available)
+    get the empty dataset. dataset['digest'] is the upload actually loaded, None for the empty dataset.
+    """
+    upload = _read_session_upload(session_id)
+    if upload is None:
+        return EMPTY_DATASET
+    _touch_session_upload(session_id)
+
+    # Datasets uploaded through another worker, or evicted from this one, are read from the upload cache
+    dataset = _load(upload['digest'])
+    return dataset if dataset is not None else EMPTY_DATASET
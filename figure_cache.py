@@ -0,0 +1,41 @@
+import os
+import threading
+from collections import OrderedDict
+
+# Number of figures kept per process, overridable from the environment
+FIGURE_CACHE_SIZE = int(os.environ.get('SOS_FIGURE_CACHE_SIZE', 128))
+
+# (dataset version, callback name, parameters) -> built figure, least recently used first
+_figures = OrderedDict()
+_lock = threading.Lock()
+
+def cached_figure(version, name, params, build):
+    """
+    Return build() for a dataset version, callback name and parameter tuple, reusing the previous
+    result while the dataset is unchanged. A new upload has a new version, so stale figures are never
+    served. Callers must not modify the returned object. Without a version (no upload) nothing is cached.
+    """
+    if version is None:
+        return build()
+
+    key = (version, name, params)
+    with _lock:
+        if key in _figures:
+            _figures.move_to_end(key)
+            return _figures[key]
+
+    result = build()
+
+    with _lock:
+        _figures[key] = result
+        _figures.move_to_end(key)
+        while len(_figures) > FIGURE_CACHE_SIZE:
+            _figures.popitem(last=False)
+    return result
+
+def clear_figure_cache(version=None):
+    """Drop cached figures, for one dataset version or all of them"""
+    with _lock:
+        for key in list(_figures):
+            if version is None or key[0] == version:
+                del _figures[key]
@@ -0,0 +1,218 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import combinations
+import numpy as np
+import pandas as pd
+
+# Columns offered on the Frequency Tables tab
+frequency_columns = ['District', 'School', 'Race/Ethnicity', 'Gender', 'County',
+                     'Income Range (Thousands)', 'Age at Sign Up', 'Age Now',
+                     'Follow Through', 'Club', 'Learn Participation 2022',
+                     'Explore Participation', 'Make It Happen Badge (Yes/No)',
+                     'Trip Eligible (Yes/No)', 'Scholarship Badge (Yes/No)',
+                     'Zip Code']
+
+# Columns the frequency tables can be filtered by
+filter_populations = ['Follow Through', 'District', 'Trip Eligible (Yes/No)',
+                      'Explore Participation','Make It Happen Badge (Yes/No)','Learn Participation 2022',
+                      'Scholarship Badge (Yes/No)', 'Income Range (Thousands)', 'School', 'Gender']
+
+# Filter populations compared as strings; the rest are compared as numbers
+string_populations = ['Income Range (Thousands)', 'District', 'School', 'Gender', 'Race/Ethnicity']
+
+CUBE_WORKERS = int(os.environ.get('SOS_CUBE_WORKERS', min(4, os.cpu_count() or 1)))
+
+def _bincount(codes, n, rows):
+    """Counts of non-missing codes (0..n-1) over the selected rows"""
+    selected = codes[rows]
+    return np.bincount(selected[selected >= 0], minlength=n)
+
+def _pair_counts(codes_a, n_a, codes_b, n_b, rows):
+    """Two-way count table of two coded columns over the selected rows"""
+    a, b = codes_a[rows], codes_b[rows]
+    valid = (a >= 0) & (b >= 0)
+    return np.bincount(a[valid] * n_b + b[valid], minlength=n_a * n_b).reshape(n_a, n_b)
+
+def build_frequency_cube(clients, active_years, columns=None):
+    """
+    Pre-aggregate client counts for the Frequency Tables tab: every column is coded once, and one-way
+    and two-way counts are computed for all clients and for each service year (active_years masks).
+    Other questions are answered from the column codes by query_counts.
+    """
+    if columns is None:
+        columns = list(dict.fromkeys(frequency_columns + filter_populations))
+    columns = [col for col in columns if col in clients.columns]
+
+    codes, values = {}, {}
+    for col in columns:
+        try:
+            # Sorted like value_counts().sort_index() / crosstab; missing values get code -1
+            codes[col], values[col] = pd.factorize(clients[col], sort=True)
+        except TypeError:
+            # Unsortable mixed-type columns are left out, and not offered in the dropdowns (coded_columns)
+            print(f"Frequency tables: skipping column '{col}' (values of mixed types cannot be sorted)")
+            continue
+
+    slices = {'all': np.ones(len(clients), dtype=bool)}
+    for year in active_years.columns:
+        slices[year] = active_years[year].to_numpy()
+
+    coded = list(codes)
+    tasks = [(col,) for col in coded] + list(combinations(coded, 2))
+
+    def count(task, rows):
+        if len(task) == 1:
+            return _bincount(codes[task[0]], len(values[task[0]]), rows)
+        a, b = task
+        return _pair_counts(codes[a], len(values[a]), codes[b], len(values[b]), rows)
+
+    counts = {}
+    with ThreadPoolExecutor(max_workers=max(1, CUBE_WORKERS)) as pool:
+        for name, rows in slices.items():
+            for task, result in zip(tasks, pool.map(lambda t: count(t, rows), tasks)):
+                counts[(name,) + task] = result
+
+    # String forms of each column's values, for filters compared as text
+    labels = {col: np.asarray(uniques.astype(str)) for col, uniques in values.items()}
+
+    # Sorted distinct values with client counts, for the dropdowns; service years with active clients
+    distinct = {}
+    for col in coded:
+        column_values = list(values[col])
+        if col in ['Follow Through', 'Club']:
+            try:
+                column_values = [int(value) for value in column_values]
+            except (ValueError, TypeError):
+                pass
+        distinct[col] = [(value, int(n)) for value, n in zip(column_values, counts[('all', col)])]
+    years = sorted((int(year), int(rows.sum())) for year, rows in slices.items() if year != 'all')
+
+    return {'codes': codes, 'values': values, 'labels': labels, 'slices': slices, 'counts': counts,
+            'distinct': distinct, 'years': years}
+
+def coded_columns(cube, columns):
+    """The columns, in order, that the cube can answer frequency tables for"""
+    return [col for col in columns if col in cube['codes']]
+
+def distinct_values(cube, col):
+    """Sorted distinct values of a column with their client counts, as (value, count) pairs"""
+    return cube['distinct'].get(col, [])
+
+def service_years(cube):
+    """Years with service hours, with the number of clients active in each, as (year, count) pairs"""
+    return cube['years']
+
+def cube_nbytes(cube):
+    return int(sum(a.nbytes for a in cube['codes'].values()) +
+               sum(a.nbytes for a in cube['labels'].values()) +
+               sum(a.nbytes for a in cube['slices'].values()) +
+               sum(a.nbytes for a in cube['counts'].values()))
+
+def _slice_rows(cube, slice):
+    """Row mask of a year slice ('all' or a year), or None for a slice with no data"""
+    if slice == 'all':
+        return cube['slices']['all']
+    if slice in range(2020, 2100) and str(slice) in cube['slices']:
+        return cube['slices'][str(slice)]
+    return None
+
+def _matching_codes(cube, col, value):
+    """Codes of a column's values matching a filter value (or any of a list of values)"""
+    if isinstance(value, (list, tuple, set)):
+        matches = [_matching_codes(cube, col, v) for v in value]
+        return np.unique(np.concatenate(matches)) if matches else np.array([], dtype=np.intp)
+    if col in string_populations:
+        return np.flatnonzero(cube['labels'][col] == str(value))
+    if col in ['Follow Through', 'Club']:
+        try:
+            value = int(value)
+        except (ValueError, TypeError):
+            pass
+    return np.flatnonzero(np.asarray(cube['values'][col] == value, dtype=bool))
+
+def _filter_rows(cube, col, value):
+    """Row mask of clients whose col matches value"""
+    # One extra slot so missing values (code -1) look up False
+    lookup = np.zeros(len(cube['values'][col]) + 1, dtype=bool)
+    lookup[_matching_codes(cube, col, value)] = True
+    return lookup[cube['codes'][col]]
+
+def query_counts(cube, group_by, filters=(), slice='all'):
+    """
+    Client counts grouped by the group_by columns, among clients matching every filter and active
+    in slice ('all' or a year). filters is a list of (column, value) pairs; value may be a list to
+    match any of several values. Returns (counts array with one axis per group_by column, list of
+    the values along each axis), or None when a column or the slice is not available.
+    """
+    group_by, filters = list(group_by), list(filters)
+    if any(col not in cube['codes'] for col in group_by + [col for col, _ in filters]):
+        return None
+    rows = _slice_rows(cube, slice)
+    if rows is None:
+        return None
+    name = 'all' if slice == 'all' else str(slice)
+    values = [cube['values'][col] for col in group_by]
+
+    # Unfiltered one- and two-way tables, and one-way tables filtered on one other column,
+    # are read off the precomputed counts
+    if not filters and len(group_by) == 1:
+        return cube['counts'][(name, group_by[0])], values
+    if not filters and len(group_by) == 2 and group_by[0] != group_by[1]:
+        return _pair(cube, name, *group_by), values
+    if len(filters) == 1 and len(group_by) == 1 and filters[0][0] != group_by[0]:
+        col, value = filters[0]
+        return _pair(cube, name, group_by[0], col)[:, _matching_codes(cube, col, value)].sum(axis=1), values
+
+    # Anything else intersects the filter masks and counts the matching rows in one pass
+    for col, value in filters:
+        rows = rows & _filter_rows(cube, col, value)
+    shape = tuple(len(v) for v in values)
+    combined = np.zeros(int(rows.sum()), dtype=np.int64)
+    valid = np.ones(len(combined), dtype=bool)
+    for col, n in zip(group_by, shape):
+        codes = cube['codes'][col][rows]
+        valid &= codes >= 0
+        combined = combined * n + codes
+    counts = np.bincount(combined[valid], minlength=int(np.prod(shape))).reshape(shape)
+    return counts, values
+
+def _pair(cube, name, a, b):
+    """Precomputed two-way counts for columns a (rows) and b (columns)"""
+    if (name, a, b) in cube['counts']:
+        return cube['counts'][(name, a, b)]
+    return cube['counts'][(name, b, a)].T
+
+def population_filters(pop='all', pop_value=None):
+    """Filter list for the frequency tables' population dropdowns, or None for an unknown population"""
+    if pop == 'all':
+        return []
+    if pop in filter_populations:
+        return [(pop, pop_value)]
+    return None
+
+def cube_value_counts(cube, var, filters=(), slice='all'):
+    """One-way frequency table: DataFrame of [var, 'count'] for the observed values, sorted by value"""
+    result = None if filters is None else query_counts(cube, [var], filters, slice)
+    if result is None:
+        return pd.DataFrame()
+    counts, (values,) = result
+    observed = counts > 0
+    if not observed.any():
+        return pd.DataFrame()
+    return pd.DataFrame({var: values[observed], 'count': counts[observed]})
+
+def cube_crosstab(cube, var1, var2, filters=(), slice='all'):
+    """Two-way frequency table shaped like pd.crosstab(var1, var2)"""
+    result = None if filters is None else query_counts(cube, [var1, var2], filters, slice)
+    if result is None:
+        return pd.DataFrame()
+    counts, (values1, values2) = result
+
+    # Like crosstab, keep only values that occur together with a value of the other column
+    keep_rows = counts.sum(axis=1) > 0
+    keep_cols = counts.sum(axis=0) > 0
+    if not keep_rows.any():
+        return pd.DataFrame()
+    return pd.DataFrame(counts[np.ix_(keep_rows, keep_cols)],
+                        index=pd.Index(values1[keep_rows], name=var1),
+                        columns=pd.Index(values2[keep_cols], name=var2))
@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import geopandas as gpd
+import pandas as pd
+import shapely
+from topology import encode_topology, subset_topology
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ZCTA_PATH = os.path.join(BASE_DIR, 'texas_zcta_2024_simplified.geojson')
+DISTRICT_PATH = os.path.join(BASE_DIR, 'School_Districts_2025_.geojson')
+
+# Prebuilt TopoJSON layers from build_map_layers.py
+MAP_LAYERS_DIR = os.environ.get('SOS_MAP_LAYERS_DIR', os.path.join(BASE_DIR, 'map_layers'))
+
+# Ship map geometry to the browser as TopoJSON (set SOS_MAP_TOPOJSON=0 to send plain GeoJSON)
+MAP_TOPOJSON = os.environ.get('SOS_MAP_TOPOJSON', '1') != '0'
+
+# Coverage area ZIP codes shown on the ZIP code maps
+coverage_zips = [
+    # Bexar County
+    '78201', '78202', '78203', '78204', '78205', '78206', '78207', '78208', '78209',
+    '78210', '78211', '78212', '78213', '78214', '78215', '78216', '78217', '78218',
+    '78219', '78220', '78221', '78222', '78223', '78224', '78225', '78226', '78227',
+    '78228', '78229', '78230', '78231', '78232', '78233', '78234', '78235', '78236',
+    '78237', '78238', '78239', '78240', '78241', '78242', '78243', '78244', '78245',
+    '78246', '78247', '78248', '78249', '78250', '78251', '78252', '78253', '78254',
+    '78255', '78256', '78257', '78258', '78259', '78260', '78261', '78263', '78264',
+    '78265', '78266', '78268', '78269', '78270', '78278', '78279', '78280', '78283',
+    '78284', '78285', '78288', '78289', '78291', '78292', '78293', '78294', '78295',
+    '78296', '78297', '78298', '78299',
+    # Surrounding counties
+    '78130', '78132', '78133', '78135',  # Comal
+    '78108', '78123', '78154', '78155',  # Guadalupe
+    '78114', '78118',                    # Wilson
+    '78016', '78017', '78073',           # Medina
+    '78006', '78015', '78024', '78025', '78070',  # Kendall
+    '78003', '78055', '78063', '78883', '78885'   # Bandera
+]
+
+# Map layers are loaded and reprojected once per process, then shared by every callback.
+# Callers must treat the returned GeoDataFrames as read-only (merge/copy before adding columns).
+_layers = {}
+_lock = threading.RLock()
+
+def _cached_layer(name, build):
+    """Build a layer on first use; failures are not cached so a missing file can be added later"""
+    layer = _layers.get(name)
+    if layer is not None:
+        return layer
+    with _lock:
+        if name not in _layers:
+            _layers[name] = build()
+        return _layers[name]
+
+def _load_zcta():
+    zip_shapes = gpd.read_file(ZCTA_PATH)
+    # Normalize ZIP codes to plain 5-digit strings
+    zip_shapes['ZCTA5CE20'] = zip_shapes['ZCTA5CE20'].astype(str).str.strip().str[:5]
+    return zip_shapes.to_crs('EPSG:4326').reset_index(drop=True)
+
+def zcta_layer():
+    """All Texas ZIP code tabulation areas in EPSG:4326"""
+    return _cached_layer('zcta', _load_zcta)
+
+def coverage_zcta_layer():
+    """ZCTA shapes restricted to the SOS coverage area ZIP codes"""
+    def build():
+        zip_shapes = zcta_layer()
+        return zip_shapes[zip_shapes['ZCTA5CE20'].isin(coverage_zips)].reset_index(drop=True)
+    return _cached_layer('coverage_zcta', build)
+
+def zcta_layer_for(zip_codes):
+    """Coverage area shapes plus any other ZCTAs in zip_codes (e.g. ZIPs with recorded service outside the area)"""
+    coverage = coverage_zcta_layer()
+    zip_codes = set(zip_codes) - set(coverage['ZCTA5CE20'])
+    if not zip_codes:
+        return coverage
+    zip_shapes = zcta_layer()
+    extra = zip_shapes[zip_shapes['ZCTA5CE20'].isin(zip_codes)]
+    return gpd.GeoDataFrame(
+        pd.concat([coverage, extra], ignore_index=True), crs=coverage.crs)
+
+def district_layer():
+    """School district shapes in EPSG:4326"""
+    return _cached_layer('district', lambda: gpd.read_file(DISTRICT_PATH).to_crs('EPSG:4326'))
+
+# Simplification tolerance (degrees) for each level of detail; None keeps the source polygons.
+# Roughly half a screen pixel at the zoom levels lod_for_zoom picks them for.
+LOD_TOLERANCES = {'low': 0.002, 'medium': 0.0005, 'full': None}
+
+# Feature id column of each shape layer
+LAYER_KEYS = {'zcta': 'ZCTA5CE20', 'district': 'NAME'}
+
+def lod_for_zoom(zoom):
+    """Coarsest level of detail that still looks right at a map zoom level"""
+    if zoom is None or zoom < 10:
+        return 'low'
+    if zoom < 12:
+        return 'medium'
+    return 'full'
+
+def _features(layer, key, tolerance):
+    """GeoJSON features for a layer, keyed and identified by its key column (properties are left empty)"""
+    geometry = layer.geometry
+    if tolerance is not None:
+        try:
+            # Simplify shared edges once for both neighbours so boundaries stay gap-free
+            # and still share arcs in the TopoJSON encoding
+            geometry = gpd.GeoSeries(shapely.coverage_simplify(geometry.values, tolerance), crs=geometry.crs)
+        except Exception:
+            geometry = geometry.simplify(tolerance, preserve_topology=True)
+    shapes = geometry.__geo_interface__['features']
+    return {feature_id: {'type': 'Feature', 'id': feature_id, 'properties': {}, 'geometry': shape['geometry']}
+            for feature_id, shape in zip(layer[key], shapes)}
+
+def layer_features(source, lod='full'):
+    """Precompiled GeoJSON features for a layer ('zcta' or 'district') at a level of detail, keyed by feature id"""
+    layers = {'zcta': zcta_layer, 'district': district_layer}
+    return _cached_layer(f'{source}_features_{lod}',
+                         lambda: _features(layers[source](), LAYER_KEYS[source], LOD_TOLERANCES[lod]))
+
+def feature_collection(source, ids, lod='full'):
+    """
+    FeatureCollection for the given feature ids, built from shared precompiled features.
+    Pass the same ids as the trace locations; Plotly matches them on each feature's id.
+    The source layer and level of detail are recorded so the browser-side cache can swap levels.
+    """
+    features = layer_features(source, lod)
+    return {'type': 'FeatureCollection', 'source': source, 'lod': lod,
+            'features': [features[i] for i in ids if i in features]}
+
+def layer_topology_path(source, lod):
+    return os.path.join(MAP_LAYERS_DIR, f'{source}_{lod}.topo.json')
+
+def layer_topology(source, lod='full'):
+    """TopoJSON for a whole layer at a level of detail, from the prebuilt file when it is up to date"""
+    def build():
+        path = layer_topology_path(source, lod)
+        shapes_path = ZCTA_PATH if source == 'zcta' else DISTRICT_PATH
+        if os.path.exists(path) and (not os.path.exists(shapes_path)
+                                     or os.path.getmtime(path) >= os.path.getmtime(shapes_path)):
+            with open(path) as f:
+                return json.load(f)
+        return encode_topology(layer_features(source, lod))
+    return _cached_layer(f'{source}_topology_{lod}', build)
+
+def shipped_geometry(geojson):
+    """
+    Geometry payload for the browser: the FeatureCollection's shapes as compact TopoJSON,
+    or the FeatureCollection itself when TopoJSON is disabled or fails.
+    """
+    if not MAP_TOPOJSON or not geojson.get('source'):
+        return geojson
+    try:
+        topology = layer_topology(geojson['source'], geojson['lod'])
+        return subset_topology(topology, [feature['id'] for feature in geojson['features']])
+    except Exception as e:
+        print(f"TopoJSON encoding failed, sending GeoJSON: {e}")
+        return geojson
+
+def clear_geometry_cache():
+    """Drop loaded layers, e.g. after replacing a GeoJSON file"""
+    with _lock:
+        _layers.clear()
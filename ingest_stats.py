@@ -0,0 +1,68 @@
+import json
+import os
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Measure each stage's peak memory with tracemalloc (more precise, but slows parsing down);
+# by default the growth of the process's peak RSS is reported instead
+TRACE_MEMORY = os.environ.get('SOS_INGEST_TRACEMALLOC', '0') == '1'
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+class IngestStats:
+    """Wall time, rows in/out and peak memory growth for each stage of an upload"""
+
+    def __init__(self):
+        self.stages = []
+        self._current = None
+
+    def start(self, name, rows_in=None):
+        """Start timing a stage (finishing the previous one if it is still open)"""
+        self.finish()
+        if TRACE_MEMORY:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            memory = tracemalloc.get_traced_memory()[0]
+        else:
+            memory = _peak_rss_mb()
+        self._current = {'stage': name, 'rows_in': rows_in, 'started': time.perf_counter(), 'memory': memory}
+
+    def finish(self, rows_out=None, **details):
+        """Record the open stage, if any; details are extra figures kept with the stage (e.g. bytes_before)"""
+        current, self._current = self._current, None
+        if current is None:
+            return
+        if TRACE_MEMORY:
+            peak_mb = (tracemalloc.get_traced_memory()[1] - current['memory']) / 1e6
+        elif current['memory'] is not None:
+            peak_mb = _peak_rss_mb() - current['memory']
+        else:
+            peak_mb = None
+        self.stages.append({
+            'stage': current['stage'],
+            'seconds': round(time.perf_counter() - current['started'], 4),
+            'rows_in': current['rows_in'],
+            'rows_out': rows_out,
+            'peak_mb': round(peak_mb, 2) if peak_mb is not None else None,
+            **details
+        })
+
+def log_ingest_stats(filename, digest, stages):
+    """Print the stage measurements of an upload as one JSON log line"""
+    print("INGEST_STATS " + json.dumps({
+        'filename': filename,
+        'digest': digest[:12] if digest else None,
+        'memory': 'tracemalloc' if TRACE_MEMORY else 'peak_rss',
+        'total_seconds': round(sum(stage['seconds'] for stage in stages), 4),
+        'stages': stages
+    }))
@@ -0,0 +1,125 @@
+"""
+Per-callback latency, call, error and payload metrics, served in Prometheus text format on /metrics.
+
+Every server-side Dash callback is dispatched through one Flask endpoint (_dash-update-component),
+so the callbacks are timed there. Metrics are kept per process: under gunicorn each worker reports
+its own callbacks.
+"""
+import os
+import threading
+import time
+from flask import Response, g, request
+
+# Histogram bucket upper bounds: callback latency in seconds and response payload size in bytes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+PAYLOAD_BUCKETS = (1000, 10000, 100000, 250000, 500000, 1000000, 2500000, 5000000, 10000000)
+
+METRICS_PATH = os.environ.get('SOS_METRICS_PATH', '/metrics')
+
+# callback id -> {'name', 'calls', 'errors', 'latency': [bucket counts], 'latency_sum', 'payload': [...], 'payload_sum'}
+_callbacks = {}
+
+_lock = threading.Lock()
+
+def _observe(buckets, counts, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            counts[i] += 1
+            return
+    counts[-1] += 1
+
+def record_callback(callback_id, name, seconds, payload_bytes, error=False):
+    """Add one callback call to the metrics"""
+    with _lock:
+        entry = _callbacks.get(callback_id)
+        if entry is None:
+            entry = _callbacks[callback_id] = {
+                'name': name,
+                'calls': 0,
+                'errors': 0,
+                'latency': [0] * (len(LATENCY_BUCKETS) + 1),
+                'latency_sum': 0.0,
+                'payload': [0] * (len(PAYLOAD_BUCKETS) + 1),
+                'payload_sum': 0
+            }
+        entry['calls'] += 1
+        entry['errors'] += int(error)
+        _observe(LATENCY_BUCKETS, entry['latency'], seconds)
+        entry['latency_sum'] += seconds
+        _observe(PAYLOAD_BUCKETS, entry['payload'], payload_bytes)
+        entry['payload_sum'] += payload_bytes
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _histogram_lines(metric, labels, buckets, counts, total):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(list(buckets) + ['+Inf'], counts):
+        cumulative += count
+        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{metric}_sum{{{labels}}} {total}')
+    lines.append(f'{metric}_count{{{labels}}} {cumulative}')
+    return lines
+
+def render_metrics():
+    """All callback metrics in Prometheus text exposition format"""
+    with _lock:
+        entries = {callback_id: dict(entry, latency=list(entry['latency']), payload=list(entry['payload']))
+                   for callback_id, entry in _callbacks.items()}
+
+    calls = ['# HELP sos_callback_calls_total Dash callback calls.',
+             '# TYPE sos_callback_calls_total counter']
+    errors = ['# HELP sos_callback_errors_total Dash callback calls that failed.',
+              '# TYPE sos_callback_errors_total counter']
+    latency = ['# HELP sos_callback_latency_seconds Dash callback latency, including response serialization.',
+               '# TYPE sos_callback_latency_seconds histogram']
+    payload = ['# HELP sos_callback_payload_bytes Dash callback response size.',
+               '# TYPE sos_callback_payload_bytes histogram']
+
+    for callback_id, entry in sorted(entries.items(), key=lambda item: (item[1]['name'], item[0])):
+        labels = f'callback="{_label(entry["name"])}",output="{_label(callback_id)}"'
+        calls.append(f'sos_callback_calls_total{{{labels}}} {entry["calls"]}')
+        errors.append(f'sos_callback_errors_total{{{labels}}} {entry["errors"]}')
+        latency += _histogram_lines('sos_callback_latency_seconds', labels, LATENCY_BUCKETS,
+                                    entry['latency'], round(entry['latency_sum'], 6))
+        payload += _histogram_lines('sos_callback_payload_bytes', labels, PAYLOAD_BUCKETS,
+                                    entry['payload'], entry['payload_sum'])
+
+    return '\n'.join(calls + errors + latency + payload) + '\n'
+
+def init_metrics(app):
+    """Time every callback request of a Dash app and serve the metrics on its Flask server"""
+    server = app.server
+    dispatch_path = app.config.requests_pathname_prefix + '_dash-update-component'
+
+    def callback_name(callback_id):
+        # Callbacks registered with dash.callback reach app.callback_map when the server starts
+        callback = app.callback_map.get(callback_id, {}).get('callback')
+        return getattr(callback, '__name__', callback_id)
+
+    @server.before_request
+    def start_callback_timer():
+        if request.path == dispatch_path:
+            g.callback_started = time.perf_counter()
+
+    @server.after_request
+    def record_callback_metrics(response):
+        started = g.pop('callback_started', None)
+        if started is None:
+            return response
+        try:
+            body = request.get_json(silent=True) or {}
+            callback_id = body.get('output', 'unknown')
+            payload_bytes = response.calculate_content_length()
+            if payload_bytes is None:
+                payload_bytes = 0 if response.direct_passthrough else len(response.get_data())
+            record_callback(callback_id, callback_name(callback_id), time.perf_counter() - started,
+                            payload_bytes, error=response.status_code >= 400)
+        except Exception as e:
+            print(f"Could not record callback metrics: {e}")
+        return response
+
+    @server.route(METRICS_PATH)
+    def metrics():
+        return Response(render_metrics(), mimetype='text/plain; version=0.0.4; charset=utf-8')
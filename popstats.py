@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+# Columns offered in the Population Statistics dropdown
+popstat_columns = ['Zip Code', 'Age at Sign Up', 'Age Now', 'School', 'District',
+                   'Race/Ethnicity', 'Gender', 'Income Range (Thousands)']
+
+POPSTAT_WORKERS = int(os.environ.get('SOS_POPSTAT_WORKERS', min(4, os.cpu_count() or 1)))
+
+general_agg_stats = {'Galaxy ID': 'count',
+            'Age at Sign Up': ['mean', 'median', 'min', 'max'],
+            'Service Range': 'mean',
+            'Hours': ['sum', 'mean'],
+            'Follow Through': ['sum', 'mean'],
+            'Trip Eligible (Yes/No)': ['sum', 'mean'],
+            'Service Count': ['mean', 'sum'],
+            'Responses' : ['mean', 'sum'],
+            'Make It Happen Badge (Yes/No)': ['sum', 'mean'],
+            'Scholarship Badge (Yes/No)': ['sum', 'mean'],
+            'Explore Participation': ['sum', 'mean']}
+
+age_agg_stats = {'Galaxy ID': 'count',
+            'Service Range': 'mean',
+            'Hours': ['sum', 'mean'],
+            'Follow Through': ['sum', 'mean'],
+            'Trip Eligible (Yes/No)': ['sum', 'mean'],
+            'Service Count': ['mean', 'sum'],
+            'Responses' : ['mean', 'sum'],
+            'Make It Happen Badge (Yes/No)': ['sum', 'mean'],
+            'Scholarship Badge (Yes/No)': ['sum', 'mean'],
+            'Explore Participation': ['sum', 'mean']}
+
+def population_stat(df, col):
+    """Population statistics function"""
+    if df.empty or col not in df.columns:
+        return pd.DataFrame(), pd.DataFrame()
+    
+    if col != 'Age at Sign Up':
+        agg_name = df.groupby(by=col, observed=True).agg(general_agg_stats)
+    else:
+        agg_name = df.groupby(by=col, observed=True).agg(age_agg_stats)
+    
+    if 'Service Range' in agg_name.columns:
+        # Service Range is stored in whole days; report the mean in whole days
+        agg_name['Service Range'] = np.floor(agg_name['Service Range','mean']).astype('Int64')
+
+    agg_name.sort_values(by=('Galaxy ID', 'count'), ascending=False, inplace=True)
+    agg_name = agg_name.round(2)
+
+    flat_name = agg_name.copy()
+    flat_name.columns = ['_'.join(col).strip() for col in flat_name.columns.values]
+    flat_name.reset_index(inplace=True)
+    flat_name = flat_name.round(2)
+
+    return agg_name, flat_name
+
+def popstat_table(clients, col):
+    """Population statistics by a column's values, as shown in the Population Statistics table"""
+    agg_stat, flat_stat = population_stat(clients, col)
+    return agg_stat.reset_index().sort_values(by=col)
+
+def build_population_stats(clients, columns=None):
+    """Population statistics tables for every dropdown column, computed in parallel across columns"""
+    columns = [col for col in (columns or popstat_columns) if col in clients.columns]
+    if clients.empty or not columns:
+        return {}
+    
+    def build(col):
+        try:
+            return popstat_table(clients, col)
+        except Exception as e:
+            # Left out; the table is computed (and the error shown) when the column is selected
+            print(f"Could not precompute population statistics for {col}: {e}")
+            return None
+    
+    with ThreadPoolExecutor(max_workers=max(1, POPSTAT_WORKERS)) as pool:
+        tables = dict(zip(columns, pool.map(build, columns)))
+    return {col: table for col, table in tables.items() if table is not None}
@@ -0,0 +1,51 @@
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataset_store
+
+
+@pytest.fixture
+def shared_dataset(tmp_path, monkeypatch):
+    """Two sessions pointed at the same loaded upload"""
+    monkeypatch.setattr(dataset_store, 'SESSION_DIR', str(tmp_path))
+    monkeypatch.setattr(dataset_store, '_loaded_datasets', dataset_store.OrderedDict())
+
+    clients = pd.DataFrame({'School': ['A', 'B', 'C'], 'Gender': ['F', 'M', 'F'], 'Hours': [1.0, 2.0, 3.0]})
+    frames = {name: pd.DataFrame() for name in dataset_store.DATASET_FRAMES}
+    frames['clients'] = clients
+    frames['active_years'] = pd.DataFrame(index=clients.index)
+
+    dataset_store.register_session_dataset('session-a', 'digest', 'upload.xlsx', frames)
+    dataset_store.register_session_dataset('session-b', 'digest', 'upload.xlsx', frames)
+    return clients.copy()
+
+
+def test_copy_on_write_enabled_by_dataset_store():
+    # Only dataset_store is imported here, not the dashboard
+    assert pd.get_option('mode.copy_on_write')
+
+
+def test_writes_to_derived_frames_leave_other_sessions_unchanged(shared_dataset):
+    clients = dataset_store.get_session_dataset('session-a')['clients']
+
+    hours = clients['Hours']
+    hours.iloc[0] = 100.0
+    selected = clients[clients['Gender'] == 'F']
+    selected['School'] = 'Z'
+    shallow = clients.copy(deep=False)
+    shallow.loc[1, 'Hours'] = -1.0
+    renamed = clients.rename(columns={'Gender': 'Sex'})
+    renamed.iloc[2, 1] = 'X'
+
+    other = dataset_store.get_session_dataset('session-b')['clients']
+    pd.testing.assert_frame_equal(other, shared_dataset)
+
+
+def test_loaded_dataset_is_read_only(shared_dataset):
+    dataset = dataset_store.get_session_dataset('session-a')
+    with pytest.raises(TypeError):
+        dataset['clients'] = pd.DataFrame()
@@ -0,0 +1,157 @@
+"""
+Compact TopoJSON encoding for the map boundary layers.
+
+Coordinates are quantized to an integer grid, rings are cut into arcs where neighbouring shapes
+meet, shared arcs are stored once, and arc points are delta-encoded. The output follows the
+TopoJSON format; assets/map_geometry.js decodes it back to GeoJSON in the browser.
+"""
+
+def _polygons(geometry):
+    if geometry is None:
+        return []
+    if geometry['type'] == 'Polygon':
+        return [geometry['coordinates']]
+    if geometry['type'] == 'MultiPolygon':
+        return list(geometry['coordinates'])
+    return []
+
+def _quantize_ring(ring, x0, y0, kx, ky):
+    """Quantized ring as an open list of points (closing point dropped, repeated points removed)"""
+    points = []
+    for x, y in ((p[0], p[1]) for p in ring):
+        point = (int(round((x - x0) / kx)), int(round((y - y0) / ky)))
+        if not points or points[-1] != point:
+            points.append(point)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+def _find_junctions(rings):
+    """Points where rings meet or split: points seen with more than one pair of neighbours"""
+    neighbours = {}
+    for ring in rings:
+        n = len(ring)
+        for i, point in enumerate(ring):
+            prev, nxt = ring[i - 1], ring[(i + 1) % n]
+            pair = (prev, nxt) if prev < nxt else (nxt, prev)
+            neighbours.setdefault(point, set()).add(pair)
+    return {point for point, pairs in neighbours.items() if len(pairs) > 1}
+
+def _cut_ring(ring, junctions):
+    """Split an open ring into closed-up arcs between junctions"""
+    cuts = [i for i, point in enumerate(ring) if point in junctions]
+    if not cuts:
+        # No shared boundary: one closed arc, rotated to a canonical start so duplicates are found
+        start = ring.index(min(ring))
+        rotated = ring[start:] + ring[:start]
+        return [rotated + [rotated[0]]]
+
+    start = cuts[0]
+    rotated = ring[start:] + ring[:start] + [ring[start]]
+    arcs = []
+    arc = [rotated[0]]
+    for point in rotated[1:]:
+        arc.append(point)
+        if point in junctions:
+            arcs.append(arc)
+            arc = [point]
+    return arcs
+
+def encode_topology(features, quantization=100000):
+    """
+    Encode GeoJSON features (dict of feature id -> Feature with Polygon/MultiPolygon geometry)
+    as a TopoJSON Topology with one GeometryCollection named 'features'.
+    """
+    shapes = {feature_id: _polygons(feature.get('geometry')) for feature_id, feature in features.items()}
+    coords = [p for polygons in shapes.values() for polygon in polygons for ring in polygon for p in ring]
+    if not coords:
+        return {'type': 'Topology', 'transform': {'scale': [1, 1], 'translate': [0, 0]},
+                'objects': {'features': {'type': 'GeometryCollection', 'geometries': []}}, 'arcs': []}
+
+    x0 = min(p[0] for p in coords)
+    y0 = min(p[1] for p in coords)
+    kx = (max(p[0] for p in coords) - x0) / (quantization - 1) or 1
+    ky = (max(p[1] for p in coords) - y0) / (quantization - 1) or 1
+
+    # Quantize, dropping rings that collapse to fewer than three distinct points
+    quantized = {}
+    for feature_id, polygons in shapes.items():
+        kept = []
+        for polygon in polygons:
+            rings = [_quantize_ring(ring, x0, y0, kx, ky) for ring in polygon]
+            if len(rings[0]) < 3:
+                continue
+            kept.append([rings[0]] + [ring for ring in rings[1:] if len(ring) >= 3])
+        quantized[feature_id] = kept
+
+    junctions = _find_junctions([ring for polygons in quantized.values() for polygon in polygons for ring in polygon])
+
+    arcs = []
+    arc_index = {}
+
+    def arc_id(arc):
+        key = tuple(arc)
+        if key in arc_index:
+            return arc_index[key]
+        # An arc shared with a neighbour is walked in the opposite direction
+        if key[::-1] in arc_index:
+            return ~arc_index[key[::-1]]
+        arc_index[key] = len(arcs)
+        arcs.append(arc)
+        return arc_index[key]
+
+    geometries = []
+    for feature_id, polygons in quantized.items():
+        if not polygons:
+            continue
+        polygon_arcs = [[[arc_id(arc) for arc in _cut_ring(ring, junctions)] for ring in polygon]
+                        for polygon in polygons]
+        if len(polygon_arcs) == 1:
+            geometries.append({'type': 'Polygon', 'id': feature_id, 'arcs': polygon_arcs[0]})
+        else:
+            geometries.append({'type': 'MultiPolygon', 'id': feature_id, 'arcs': polygon_arcs})
+
+    # Delta-encode arc points
+    encoded_arcs = []
+    for arc in arcs:
+        encoded = [list(arc[0])]
+        for (px, py), (x, y) in zip(arc, arc[1:]):
+            encoded.append([x - px, y - py])
+        encoded_arcs.append(encoded)
+
+    return {
+        'type': 'Topology',
+        'transform': {'scale': [kx, ky], 'translate': [x0, y0]},
+        'objects': {'features': {'type': 'GeometryCollection', 'geometries': geometries}},
+        'arcs': encoded_arcs
+    }
+
+def subset_topology(topology, ids):
+    """Topology holding only the geometries with the given ids and the arcs they use"""
+    wanted = set(ids)
+    geometries = [g for g in topology['objects']['features']['geometries'] if g['id'] in wanted]
+
+    remap = {}
+    arcs = []
+
+    def remap_arc(i):
+        index = i if i >= 0 else ~i
+        if index not in remap:
+            remap[index] = len(arcs)
+            arcs.append(topology['arcs'][index])
+        return remap[index] if i >= 0 else ~remap[index]
+
+    subset = []
+    for g in geometries:
+        if g['type'] == 'Polygon':
+            g_arcs = [[remap_arc(i) for i in ring] for ring in g['arcs']]
+        else:
+            g_arcs = [[[remap_arc(i) for i in ring] for ring in polygon] for polygon in g['arcs']]
+        subset.append({'type': g['type'], 'id': g['id'], 'arcs': g_arcs})
+
+    return {
+        'type': 'Topology',
+        'transform': topology['transform'],
+        'objects': {'features': {'type': 'GeometryCollection', 'geometries': subset}},
+        'arcs': arcs
+    }
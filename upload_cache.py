@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+import pandas as pd
+
+# Bump when process_uploaded_data changes its output so stale cache entries are not reused
+CACHE_VERSION = '5'
+
+# Cache location and size budget can be overridden from the environment
+CACHE_DIR = os.environ.get('SOS_CACHE_DIR',
+                           os.path.join(os.path.dirname(os.path.abspath(__file__)), '.upload_cache'))
+CACHE_MAX_BYTES = int(float(os.environ.get('SOS_CACHE_MAX_MB', 512)) * 1024 * 1024)
+
+MANIFEST_NAME = 'manifest.json'
+
+def workbook_digest(decoded):
+    """Content hash of an uploaded workbook, used as its cache key"""
+    digest = hashlib.sha256()
+    digest.update(f'sos-upload-v{CACHE_VERSION}:'.encode())
+    digest.update(decoded)
+    return digest.hexdigest()
+
+def _entry_dir(digest):
+    return os.path.join(CACHE_DIR, digest)
+
+def _parquet_safe(df):
+    """True when every object column holds only strings, so a Parquet round trip keeps its dtypes"""
+    for col in df.columns[df.dtypes == object]:
+        if pd.api.types.infer_dtype(df[col], skipna=True) not in ('string', 'empty'):
+            return False
+    return True
+
+def _write_frame(df, path_stem):
+    """Write a frame as Parquet, falling back to pickle for frames Arrow cannot round-trip"""
+    try:
+        if not _parquet_safe(df):
+            raise ValueError("mixed-type object columns")
+        df.to_parquet(path_stem + '.parquet')
+        return 'parquet'
+    except Exception as e:
+        # Mixed-type object columns or non-string column names (common in raw Excel sheets)
+        print(f"Parquet cache write skipped for {os.path.basename(path_stem)}, using pickle: {e}")
+        if os.path.exists(path_stem + '.parquet'):
+            os.remove(path_stem + '.parquet')
+        df.to_pickle(path_stem + '.pkl')
+        return 'pickle'
+
+def _read_frame(path_stem, fmt):
+    if fmt == 'parquet':
+        # Memory-map the file so worker processes reading the same entry share the OS page cache
+        return pd.read_parquet(path_stem + '.parquet', memory_map=True)
+    return pd.read_pickle(path_stem + '.pkl')
+
+def load_cached_frames(digest):
+    """Return the processed frames cached for a workbook digest, or None on a cache miss"""
+    entry = _entry_dir(digest)
+    manifest_path = os.path.join(entry, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return None
+
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        frames = {name: _read_frame(os.path.join(entry, name), fmt)
+                  for name, fmt in manifest['frames'].items()}
+    except Exception as e:
+        print(f"Discarding unreadable cache entry {digest[:12]}: {e}")
+        shutil.rmtree(entry, ignore_errors=True)
+        return None
+
+    # Touch the manifest so eviction treats this entry as recently used
+    os.utime(manifest_path)
+    return frames
+
+def store_cached_frames(digest, frames):
+    """
+    Persist processed frames for a workbook digest, then evict old entries over the size budget.
+    Returns True if the entry was written.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    # Write into a temporary directory and move it into place so readers never see a partial entry
+    staging = tempfile.mkdtemp(prefix='.staging-', dir=CACHE_DIR)
+    try:
+        manifest = {'version': CACHE_VERSION, 'created': time.time(), 'frames': {}}
+        for name, df in frames.items():
+            manifest['frames'][name] = _write_frame(df, os.path.join(staging, name))
+        with open(os.path.join(staging, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f)
+
+        entry = _entry_dir(digest)
+        if os.path.exists(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        os.replace(staging, entry)
+    except Exception as e:
+        print(f"Could not cache upload {digest[:12]}: {e}")
+        shutil.rmtree(staging, ignore_errors=True)
+        return False
+
+    evict_cached_frames()
+    return True
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+def evict_cached_frames(max_bytes=None):
+    """Delete least recently used cache entries until the cache fits in max_bytes"""
+    max_bytes = CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(CACHE_DIR):
+        return
+
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        manifest_path = os.path.join(CACHE_DIR, name, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            entries.append((os.path.getmtime(manifest_path), _dir_size(os.path.join(CACHE_DIR, name)), name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(os.path.join(CACHE_DIR, name), ignore_errors=True)
+        total -= size
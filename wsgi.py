@@ -0,0 +1,11 @@
+"""
+Production entry point for running the dashboard under a WSGI server, e.g.
+
+    gunicorn wsgi:server --workers 4 --bind 0.0.0.0:8000
+
+Workers share processed uploads through the on-disk upload cache (upload_cache.py) and
+session pointers (dataset_store.py), so any worker can serve any session.
+"""
+from New_Dashboard import app
+
+server = app.server